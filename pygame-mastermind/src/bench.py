@@ -0,0 +1,158 @@
+"""
+Benchmarks for the rendering and game logic, run without a window.
+
+Each case is run a few times to warm up, then timed call by call.
+The median, p99, mean and fastest call are printed in microseconds,
+and can be written to JSON to compare between commits.
+
+Usage:
+    python bench.py --json before.json
+    python bench.py --json after.json --compare before.json
+"""
+
+# --- Imports ---
+import argparse, json, os, platform, random, statistics, sys, time   # Standard imports
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")   # No window needed
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame                                   # 3rd Party imports
+
+import main                                     # Local imports
+from engine import Game, DEFAULT
+
+# --- Functions ---
+
+def measure(fn, runs, warmup):
+    """
+    Calls fn warmup times, then times runs calls one by one.
+    Returns the stats in microseconds.
+    """
+    for i in range(warmup):
+        fn()
+    samples = []
+    timer = time.perf_counter_ns
+    for i in range(runs):
+        start = timer()
+        fn()
+        samples.append(timer() - start)
+    samples.sort()
+    return {
+        "median_us": statistics.median(samples) / 1000,
+        "p99_us": samples[min(len(samples) - 1, int(len(samples) * 0.99))] / 1000,
+        "mean_us": statistics.fmean(samples) / 1000,
+        "min_us": samples[0] / 1000,
+        "runs": runs
+    }
+
+
+def played(rows, seed=0):
+    """
+    Returns a Game with rows guesses entered, made from a fixed seed.
+    No box of a guess is ever right, so playing every row loses.
+    """
+    game = Game(random.Random(seed))
+    colours = game.config.colours
+    for i in range(rows):
+        guess = [(box + 1 + (i + j) % (colours - 1)) % colours for j, box in enumerate(game.secret)]
+        game.submit(guess)
+    return game
+
+
+def cases():
+    """
+    Returns a dict of case name -> function to time.
+    """
+    br, fg, bg = main.br, main.FG, main.BG
+    w, h, size = main.WIDTH, main.HEIGHT, main.SIZE
+    found = {}
+
+    # Background, from the cache and rendered from scratch
+    found["background.cached"] = lambda: br.background(0, 0, w, h, fg, bg)
+    found["background.render"] = lambda: br._render_background(w, h, fg, bg)
+
+    # Each BoxRenderer primitive
+    for name in ("fgborder", "bgborder", "blank", "fill", "vertical", "horizontal"):
+        found[f"primitive.{name}"] = lambda name=name: getattr(br, name)(0, 0, size, size)
+    found["primitive.little_border"] = lambda: br.little_border(0, 0, size, size, 10)
+    found["primitive.little_fill"] = lambda: br.little_fill(0, 0, size, size, 10)
+    found["primitive.little_dot"] = lambda: br.little_dot(0, 0, size, size)
+    found["primitive.arrow"] = lambda: br.arrow(0, 0, fg)
+
+    # Whole screens
+    menu = main.Mastermind()
+    found["draw_menu"] = menu.draw_menu
+    found["draw_controls"] = menu.draw_controls
+    rows = DEFAULT.rows
+    for name, game in (
+        ("empty", Game(random.Random(0))),
+        ("half", played(rows // 2)),
+        ("finished", played(rows))
+    ):
+        found[f"draw_game.{name}"] = main.Mastermind(game).draw_game
+
+    # Scaling the frame up to the window
+    found["present"] = main.present
+
+    # Scoring a row
+    game = played(1)
+    def check_row():
+        game.check_row(0)
+        game.feedback.pop()         # Keep the feedback from growing
+    found["check_row"] = check_row
+
+    return found
+
+
+def run():
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark Mastermind rendering and logic.")
+    parser.add_argument("--runs", type=int, default=2000, help="timed calls per case")
+    parser.add_argument("--warmup", type=int, default=200, help="untimed calls per case first")
+    parser.add_argument("--filter", default="", help="only run cases containing this")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="earlier JSON results to compare medians with")
+    args = parser.parse_args()
+
+    main.init()
+    results = {}
+    print(f"{'case':<28}{'median':>10}{'p99':>10}{'mean':>10}{'min':>10}  (us)")
+    for name, fn in cases().items():
+        if args.filter not in name:
+            continue
+        stats = results[name] = measure(fn, args.runs, args.warmup)
+        print(f"{name:<28}{stats['median_us']:>10.2f}{stats['p99_us']:>10.2f}"
+              f"{stats['mean_us']:>10.2f}{stats['min_us']:>10.2f}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            before = json.load(file)["results"]
+        print(f"\n{'case':<28}{'before':>10}{'after':>10}{'change':>10}")
+        for name, stats in results.items():
+            if name in before:
+                old, new = before[name]["median_us"], stats["median_us"]
+                print(f"{name:<28}{old:>10.2f}{new:>10.2f}{(new - old) / old:>+10.1%}")
+
+    if args.json:
+        report = {
+            "meta": {
+                "python": sys.version.split()[0],
+                "pygame": pygame.version.ver,
+                "sdl": ".".join(map(str, pygame.get_sdl_version())),
+                "platform": platform.platform(),
+                "video_driver": os.environ["SDL_VIDEODRIVER"],
+                "runs": args.runs,
+                "warmup": args.warmup
+            },
+            "results": results
+        }
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2, sort_keys=True)
+            file.write("\n")
+
+
+# --- Main ---
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,126 @@
+"""
+Keeps track of which secrets still fit a game's feedback.
+
+The codes still possible are one Python int used as a bitset, with bit
+i standing for the code engine.pack numbers i. Each scored row ANDs in
+the mask of codes that would have given that guess the same feedback,
+so a row costs one pass over codes / 64 machine words and the rows
+before it are never looked at again.
+
+Masks are worked out the first time they are needed and kept in a
+small LRU cache. With NumPy every code is scored at once, like
+scoring.score_batch but with the boxes and pattern counts of every
+code laid out as rows when the tracker is made, and the result packed
+with packbits. Without NumPy every code is scored in pure Python.
+"""
+
+# --- Imports ---
+from collections import OrderedDict             # Standard imports
+
+from engine import DEFAULT, pack, unpack        # Local imports
+from scoring import score, feedback_index
+
+# --- Consts ---
+MASK_CACHE_SIZE = 256       # (guess, feedback) masks kept
+
+# --- Classes ---
+
+class CandidateTracker:
+    """
+    The set of secrets that fit every row a Game has scored so far.
+    """
+    def __init__(self, config=DEFAULT):
+        """
+        Every code is possible to start with.
+        """
+        self.config = config
+        self.all = (1 << config.codes) - 1
+        self.masks = OrderedDict()  # (packed guess, feedback index) -> mask, LRU
+        self.codes = None           # (pegs, codes) NumPy array, None without NumPy
+        self.counts = None          # (colours, codes) count of each pattern
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        if np is not None:          # Each box and pattern count as a row over every code
+            from solver import all_codes
+            self.codes = np.ascontiguousarray(all_codes(config.pegs, config.colours).T)
+            self.counts = np.stack([(self.codes == c).sum(axis=0, dtype=np.uint8)
+                                    for c in range(config.colours)])
+        self.reset()
+
+    def reset(self):
+        """
+        Forget all feedback.
+        """
+        self.bits = self.all
+        self.feedback = None        # The Game.feedback list followed
+        self.seen = 0               # How many of its rows are in bits
+
+    def mask(self, guess, black, white):
+        """
+        Returns the bitset of codes that would score (black, white)
+        against guess.
+        """
+        config = self.config
+        guess = bytes(guess)
+        key = (pack(guess, config.colours), feedback_index(black, white, config.pegs))
+        if key in self.masks:
+            self.masks.move_to_end(key)
+            return self.masks[key]
+
+        if self.codes is not None:
+            import numpy as np                  # Already loaded by __init__
+            n = config.codes
+            b = np.zeros(n, dtype=np.uint8)
+            for col, box in enumerate(guess):   # Right pattern in the right box
+                b += self.codes[col] == box
+            total = np.zeros(n, dtype=np.uint8)
+            for c in set(guess):                # Patterns not in the guess add nothing
+                total += np.minimum(self.counts[c], guess.count(c))
+            fits = feedback_index(b, total - b, config.pegs) == key[1]
+            mask = int.from_bytes(np.packbits(fits, bitorder="little").tobytes(), "little")
+        else:                       # One code at a time, lowest bit last
+            bits = bytearray(b"0") * config.codes
+            for i in range(config.codes):
+                if score(guess, unpack(i, config.pegs, config.colours), config.colours) == (black, white):
+                    bits[config.codes - 1 - i] = ord("1")
+            mask = int(bits, 2)
+
+        self.masks[key] = mask
+        if len(self.masks) > MASK_CACHE_SIZE:
+            self.masks.popitem(last=False)
+        return mask
+
+    def update(self, guess, black, white):
+        """
+        Keeps only the codes that fit one more scored guess.
+        """
+        self.bits &= self.mask(guess, black, white)
+
+    def sync(self, game):
+        """
+        Catches up with the rows game has scored since the last sync,
+        starting over if the game was reset.
+        """
+        if game.feedback is not self.feedback:     # A new game
+            self.reset()
+            self.feedback = game.feedback
+        for row in range(self.seen, len(game.feedback)):
+            self.update(game.board[row], *game.feedback[row])
+        self.seen = len(game.feedback)
+
+    @property
+    def count(self):
+        """
+        How many codes are still possible.
+        """
+        return self.bits.bit_count()
+
+    def first(self):
+        """
+        The lowest numbered code still possible, as bytes, or None.
+        """
+        if not self.bits:
+            return None
+        return unpack((self.bits & -self.bits).bit_length() - 1, self.config.pegs, self.config.colours)
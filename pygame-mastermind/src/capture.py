@@ -0,0 +1,119 @@
+"""
+Captures the frames the game shows to an animated GIF or to PNGs.
+
+The main loop hands each presented frame to FrameCapture.add, which
+only blits it into a free Surface from a ring made up front. A worker
+thread takes the filled Surfaces, encodes them and hands them back.
+If the worker falls behind and the ring runs out of free Surfaces,
+the frame is dropped and counted, so the game never waits on it.
+
+A path ending in .gif is written as one animated GIF (needs Pillow),
+with each frame shown for as long as it was on screen. Any other path
+is a folder that gets frame000001.png, frame000002.png and so on.
+"""
+
+# --- Imports ---
+import os, queue, threading, time               # Standard imports
+
+import pygame                                   # 3rd Party imports
+
+# --- Consts ---
+RING_SIZE = 16      # Frames that can wait for the encoder before dropping
+
+# --- Classes ---
+
+class FrameCapture:
+    """
+    Copies frames into a ring of Surfaces and encodes them on a thread.
+    """
+    def __init__(self, path, screen, scale=1, ring=RING_SIZE):
+        """
+        screen is the Surface frames will come from, and sets the size
+        and pixel format of the ring. Frames are saved scale times bigger.
+        """
+        self.path = path
+        self.gif = path.lower().endswith(".gif")
+        if self.gif:
+            try:
+                from PIL import Image
+            except ImportError:
+                raise RuntimeError("GIF capture needs Pillow. Install it with pip install pillow, "
+                                   "or capture to a folder of PNGs.") from None
+            self.image = Image
+            self.frames = []        # (Pillow image, time added) for the GIF
+        else:
+            os.makedirs(path, exist_ok=True)
+
+        size = screen.get_size()
+        self.size = (size[0] * scale, size[1] * scale)
+        self.scaled = pygame.Surface(self.size, 0, screen) if scale != 1 else None
+
+        self.free = queue.SimpleQueue()     # Surfaces ready to copy a frame into
+        self.full = queue.SimpleQueue()     # (Surface, time) waiting to be encoded
+        for i in range(ring):
+            self.free.put(pygame.Surface(size, 0, screen))
+
+        self.added = 0
+        self.dropped = 0
+        self.saved = 0
+        self.worker = threading.Thread(target=self.encode, name="capture", daemon=True)
+        self.worker.start()
+
+    def add(self, screen):
+        """
+        Queues a copy of screen to be encoded, or drops it if the ring
+        is full. Never blocks.
+        """
+        try:
+            surface = self.free.get_nowait()
+        except queue.Empty:                 # Encoder is behind
+            self.dropped += 1
+            return
+        surface.blit(screen, (0, 0))
+        self.full.put((surface, time.perf_counter()))
+        self.added += 1
+
+    def encode(self):
+        """
+        The worker thread. Encodes frames until close() sends None.
+        """
+        while True:
+            item = self.full.get()
+            if item is None:
+                break
+            surface, when = item
+            frame = surface
+            if self.scaled is not None:     # Nearest neighbour, like the window
+                frame = pygame.transform.scale(surface, self.size, self.scaled)
+
+            if self.gif:
+                image = self.image.frombytes("RGB", self.size, pygame.image.tobytes(frame, "RGB"))
+                self.frames.append((image.quantize(), when))
+            else:
+                pygame.image.save(frame, os.path.join(self.path, f"frame{self.saved + 1:06d}.png"))
+            self.saved += 1
+            self.free.put(surface)          # Ready to be used again
+
+        if self.gif and self.frames:
+            self.write_gif()
+
+    def write_gif(self):
+        """
+        Writes the collected frames as one GIF, showing each until the
+        time the next one was added.
+        """
+        images = [image for image, when in self.frames]
+        times = [when for image, when in self.frames]
+        durations = [max(20, round((b - a) * 1000)) for a, b in zip(times, times[1:])]
+        durations.append(1000)              # Hold the last frame a second
+        images[0].save(self.path, save_all=True, append_images=images[1:],
+                       duration=durations, loop=0, optimize=False)
+
+    def close(self):
+        """
+        Waits for the queued frames to be encoded and finishes the file.
+        Returns (frames saved, frames dropped).
+        """
+        self.full.put(None)
+        self.worker.join()
+        return self.saved, self.dropped
@@ -0,0 +1,402 @@
+"""
+The rules of Mastermind on their own, without pygame.
+
+Importing this does not touch SDL, so games can be played in batch
+and in tests without opening a window. main.py is the pygame front
+end that draws a Game and feeds it input.
+
+Boxes are stored as small ints (the values of Patterns for the first
+four), so a board is a bytearray and a secret is a bytes object, and
+a whole code can be packed into one base-colours int.
+"""
+
+# --- Imports ---
+import os, random                               # Standard imports
+from enum import Enum
+from typing import NamedTuple
+
+from scoring import score                       # Local imports
+
+# --- Consts ---
+PEGS = 4        # Boxes in a row
+COLOURS = 4     # Patterns a box can be (everything but the arrow)
+ROWS = 6        # Guesses the player gets
+
+EMPTY = 0xFF    # Value of a box on a row that has not been reached
+
+# Where fonts, stats and feedback tables are kept between runs
+CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "mastermind"
+)
+
+# --- Classes ---
+
+# Block patterns enum
+class Patterns(Enum):
+    """
+    Holds the patterns for rendering blocks to the screen from
+    the board, includes box patterns and the up arrow.
+    """
+    blank = 0
+    vertical = 1
+    horizontal = 2
+    fill = 3
+    uparrow = 4
+
+
+class Config(NamedTuple):
+    """
+    The size of a game: boxes per row, patterns per box and rows.
+    """
+    pegs: int = PEGS
+    colours: int = COLOURS
+    rows: int = ROWS
+
+    @property
+    def codes(self):
+        """
+        Number of different codes.
+        """
+        return self.colours ** self.pegs
+
+
+DEFAULT = Config()
+
+
+def cycle_order(colours):
+    """
+    Returns a bytes table of the pattern Z cycles to from each pattern.
+    The first four go blank, horizontal, vertical, fill like they always
+    have, and any extra colours come after fill.
+    """
+    first = (Patterns.blank, Patterns.horizontal, Patterns.vertical, Patterns.fill)
+    order = [pattern.value for pattern in first if pattern.value < colours]
+    order += range(len(first), colours)
+    table = bytearray(colours)
+    for i, value in enumerate(order):
+        table[value] = order[(i + 1) % colours]
+    return bytes(table)
+
+
+def pack(code, colours=COLOURS):
+    """
+    Packs a code into one int by reading it as a base-colours number,
+    first box most significant.
+    """
+    packed = 0
+    for box in code:
+        packed = packed * colours + box
+    return packed
+
+
+def unpack(packed, pegs=PEGS, colours=COLOURS):
+    """
+    Unpacks an int made by pack back into a bytes code.
+    """
+    code = bytearray(pegs)
+    for i in range(pegs - 1, -1, -1):
+        packed, code[i] = divmod(packed, colours)
+    return bytes(code)
+
+
+def random_pattern(rng=random, config=DEFAULT):
+    """
+    Makes a random secret code. rng can be anything with a randint
+    method, like the random module or a random.Random.
+    """
+    return bytes(rng.randint(0, config.colours - 1) for i in range(config.pegs))
+
+
+class Board:
+    """
+    The rows of guesses, stored in one bytearray of rows * pegs boxes.
+    board[row] gives a row as bytes, board[row, col] gives one box.
+    """
+    __slots__ = ("pegs", "rows", "cells")
+
+    def __init__(self, pegs=PEGS, rows=ROWS):
+        """
+        Makes a board with every box EMPTY.
+        """
+        self.pegs = pegs
+        self.rows = rows
+        self.cells = bytearray([EMPTY]) * (pegs * rows)
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            row, col = key
+            return self.cells[row * self.pegs + col]
+        start = key * self.pegs
+        return bytes(self.cells[start:start + self.pegs])
+
+    def __setitem__(self, key, value):
+        if isinstance(key, tuple):
+            row, col = key
+            self.cells[row * self.pegs + col] = value
+        else:
+            start = key * self.pegs
+            self.cells[start:start + self.pegs] = bytes(value)
+
+    def __len__(self):
+        return self.rows
+
+    def __iter__(self):
+        for row in range(self.rows):
+            yield self[row]
+
+    def __eq__(self, other):
+        return isinstance(other, Board) and self.cells == other.cells
+
+    def __bytes__(self):
+        return bytes(self.cells)
+
+    def copy(self):
+        """
+        Returns an independent copy of the board.
+        """
+        board = Board.__new__(Board)
+        board.pegs = self.pegs
+        board.rows = self.rows
+        board.cells = self.cells[:]
+        return board
+
+
+class Game:
+    """
+    The state of one game of Mastermind: the board of guesses, the
+    secret code, the feedback, and where the cursor is.
+    """
+    __slots__ = (
+        "config", "rng", "cycle_table", "board", "secret",
+        "feedback", "current_row", "current_col", "game_ended", "won"
+    )
+
+    def __init__(self, rng=random, config=DEFAULT):
+        """
+        Start a new game. rng is used for the secret code.
+        """
+        self.config = config
+        self.rng = rng
+        self.cycle_table = cycle_order(config.colours)
+        self.reset()
+
+    def reset(self):
+        """
+        Clears the board and picks a new secret code.
+        """
+        self.board = Board(self.config.pegs, self.config.rows)
+        self.board[0] = bytes(self.config.pegs)     # First row to fill in, all blank
+
+        self.secret = random_pattern(self.rng, self.config)
+
+        self.current_row = 0
+        self.current_col = 0
+
+        self.feedback = []      # (black, white) per row
+
+        self.game_ended = False
+
+        self.won = False
+
+    @property
+    def pattern(self):
+        """
+        The secret code as a list of ints.
+        """
+        return list(self.secret)
+
+    @property
+    def scores(self):
+        """
+        The score pegs per row to draw. A "fill" peg is a right pattern
+        in the right box, a "blank" peg is a right pattern in the wrong
+        box, and the rest are "dot"s.
+        """
+        pegs = self.config.pegs
+        return [
+            ["fill"] * black + ["blank"] * white + ["dot"] * (pegs - black - white)
+            for black, white in self.feedback
+        ]
+
+    def check_row(self, row):
+        """
+        Scores the row against the secret and adds it to the feedback.
+        Returns (black, white).
+        """
+        black, white = score(self.board[row], self.secret, self.config.colours)
+        self.feedback.append((black, white))
+
+        # Checks the win
+        if black == self.config.pegs:
+            self.game_ended = True  # The game has ended
+            self.won = True         # AND the user has won
+
+        return black, white
+
+    # --- Cursor controls ---
+
+    def move_left(self):
+        """
+        Go left a col.
+        """
+        if self.current_col > 0:
+            self.current_col -= 1
+
+    def move_right(self):
+        """
+        Go right a col.
+        """
+        if self.current_col < self.config.pegs - 1:
+            self.current_col += 1
+
+    def cycle(self):
+        """
+        Change the pattern stored at the current selection.
+        """
+        if self.game_ended:
+            return
+        key = (self.current_row, self.current_col)
+        self.board[key] = self.cycle_table[self.board[key]]
+
+    def enter(self):
+        """
+        Enter the current row. Moves on to a clear row, or ends the
+        game on a win or after the last row.
+        """
+        if self.game_ended:
+            return
+        self.check_row(self.current_row)        # Check win
+        if self.won:
+            return
+        if self.current_row < self.config.rows - 1:     # If not the last row
+            self.current_row += 1               # Change row and col ptrs
+            self.current_col = 0                # and add clear row
+            self.board[self.current_row] = bytes(self.config.pegs)
+        else:                                   # If last row (final guess)
+            self.game_ended = True              # End game
+
+    def fill_row(self, guess):
+        """
+        Puts a whole guess (a sequence of ints) into the current row
+        without entering it.
+        """
+        if self.game_ended:
+            raise ValueError("the game is already over")
+        if len(guess) != self.config.pegs or max(guess) >= self.config.colours:
+            raise ValueError(f"not a code for {self.config}: {list(guess)}")
+        self.board[self.current_row] = guess
+
+    def submit(self, guess):
+        """
+        Puts a whole guess into the current row and enters it, for
+        playing without the cursor. Returns (black, white).
+        """
+        self.fill_row(guess)
+        self.enter()
+        return self.feedback[-1]
+
+
+# Input actions the screens take, in the order they are numbered in recordings
+ACTIONS = ("up", "down", "left", "right", "select", "enter", "back", "hint", "reveal")
+
+MENU = ("game", "controls", "stats", "exit")    # State each menu option goes to
+
+
+class Session:
+    """
+    The screens around a Game: which one is showing, the menu option
+    and the game itself. Input actions (values of ACTIONS) move it on
+    the same way in the window and in a replay, so it never needs pygame.
+    """
+    __slots__ = ("state", "option", "game", "solver", "tracker")
+
+    def __init__(self, game=None):
+        """
+        Starts on the menu. A new Game is made if none is given.
+        """
+        self.state = "menu"
+        self.option = 0
+        self.game = game if game is not None else Game()
+        self.solver = None      # Made on the first hint, as it needs NumPy
+        self.tracker = None     # candidates.CandidateTracker, made when first needed
+
+    def handle(self, action):
+        """
+        Applies one input action. Returns the new state.
+        """
+        # Scroll the menu
+        if self.state == "menu":                # Menu controls for navigation
+            match action:
+                case "up":
+                    if self.option > 0:
+                        self.option -= 1
+                case "down":
+                    if self.option < len(MENU) - 1:
+                        self.option += 1
+                case "select":
+                    self.state = MENU[self.option]
+            return self.state
+
+        if action == "back":                    # Allow escape to be used on any non menu
+            if self.state == "game":            # New board and pattern on esc
+                self.game.reset()
+            self.state = "menu"
+            return self.state
+
+        # Main game controls
+        if self.state == "game":
+            match action:
+                case "left":                    # Go left a col
+                    self.game.move_left()
+                case "right":                   # Go right a col
+                    self.game.move_right()
+                case "enter":                   # Enter row
+                    self.game.enter()
+                case "select":                  # Change the pattern at current selection
+                    self.game.cycle()
+                case "hint":                    # Fill the row with the solver's guess
+                    self.hint()
+                case "reveal":                  # Fill the row with a code that still fits
+                    self.reveal()
+
+        return self.state
+
+    def hint(self):
+        """
+        Fills the current row with the guess the minimax solver would
+        make from the rows entered so far.
+        """
+        if self.game.game_ended:
+            return
+        if self.solver is None:
+            try:
+                from solver import Solver
+            except ImportError:             # Warn when NumPy is missing
+                print("Hints need NumPy. Install it with pip install numpy.")
+                return
+            config = self.game.config
+            self.solver = Solver(config.pegs, config.colours)
+        self.game.fill_row(self.solver.suggest(self.game))
+
+    def track(self):
+        """
+        Returns the candidate tracker, caught up with the rows scored
+        so far. Only new rows are looked at.
+        """
+        if self.tracker is None:
+            from candidates import CandidateTracker
+            self.tracker = CandidateTracker(self.game.config)
+        self.tracker.sync(self.game)
+        return self.tracker
+
+    def reveal(self):
+        """
+        Fills the current row with the lowest numbered code that fits
+        all the feedback so far.
+        """
+        if self.game.game_ended:
+            return
+        code = self.track().first()
+        if code is not None:
+            self.game.fill_row(code)
@@ -0,0 +1,134 @@
+"""
+Plays lots of games against server.py at once to load test it.
+
+Each connection plays several games at once, guessing random codes,
+and times every GUESS from sending it to getting its reply. At the end
+the guesses per second and the latency percentiles are printed.
+
+Usage:
+    python server.py &
+    python loadgen.py -c 8 -p 16 -d 10
+"""
+
+# --- Imports ---
+import argparse, asyncio, random, time          # Standard imports
+
+from server import DIGITS                       # Local imports
+
+# --- Functions ---
+
+_codes = {}         # (pegs, colours) -> every code as a line ending
+
+
+def codes(pegs, colours):
+    """
+    Every code for a board size, written ready to send, worked out once.
+    """
+    if (pegs, colours) not in _codes:
+        found = [b""]
+        for i in range(pegs):
+            found = [code + DIGITS[c].encode() for code in found for c in range(colours)]
+        _codes[pegs, colours] = [code + b"\n" for code in found]
+    return _codes[pegs, colours]
+
+
+async def player(connect, deadline, rng, depth, latencies, counts):
+    """
+    Plays depth games at a time on one connection until the deadline.
+    One guess for each game is sent in a single write, then the replies
+    are read back in order.
+    """
+    reader, writer = await connect()
+    timer = time.perf_counter
+    games = []                  # (GUESS prefix, codes) per game being played
+    while timer() < deadline:
+        if len(games) < depth:                  # Start games up to depth
+            writer.write(b"NEW\n" * (depth - len(games)))
+            for i in range(depth - len(games)):
+                reply = (await reader.readline()).split()
+                if reply[0] != b"OK":
+                    raise RuntimeError(f"NEW failed: {b' '.join(reply).decode()}")
+                games.append((b"GUESS " + reply[1] + b" ", codes(int(reply[2]), int(reply[3]))))
+
+        batch = [prefix + rng.choice(guesses) for prefix, guesses in games]
+        start = timer()
+        writer.write(b"".join(batch))
+        playing = []
+        quits = 0
+        for game in games:
+            reply = await reader.readline()
+            latencies.append(timer() - start)
+            if not reply.startswith(b"FB"):
+                raise RuntimeError(f"GUESS failed: {reply.decode().strip()}")
+            if reply.endswith(b"PLAY\n"):
+                playing.append(game)
+            else:
+                counts["won" if b"WON" in reply else "lost"] += 1
+                writer.write(b"QUIT" + game[0][5:-1] + b"\n")
+                quits += 1
+        games = playing
+        for i in range(quits):                  # Read the OKs to the QUITs
+            await reader.readline()
+    writer.close()
+
+
+async def run(host, port, unix, connections, depth, duration, seed):
+    """
+    Runs the players. Returns (latencies in seconds, counts, elapsed).
+    """
+    if unix:
+        connect = lambda: asyncio.open_unix_connection(unix)
+    else:
+        connect = lambda: asyncio.open_connection(host, port)
+    latencies = []
+    counts = {"won": 0, "lost": 0}
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(
+        player(connect, deadline, random.Random(f"{seed}:{i}"), depth, latencies, counts)
+        for i in range(connections)
+    ))
+    return latencies, counts, time.perf_counter() - start
+
+
+def percentile(ordered, fraction):
+    """
+    Value at fraction of the way through a sorted list.
+    """
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description="Load test the Mastermind server.")
+    parser.add_argument("--host", default="127.0.0.1", help="server address")
+    parser.add_argument("--port", type=int, default=7777, help="server TCP port")
+    parser.add_argument("--unix", help="connect to this Unix socket instead")
+    parser.add_argument("-c", "--connections", type=int, default=32, help="connections playing at once")
+    parser.add_argument("-p", "--pipeline", type=int, default=16,
+                        help="games each connection plays at once, one guess each per write")
+    parser.add_argument("-d", "--duration", type=float, default=5, help="seconds to run for")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the guesses")
+    args = parser.parse_args()
+
+    latencies, counts, elapsed = asyncio.run(
+        run(args.host, args.port, args.unix, args.connections, args.pipeline, args.duration, args.seed)
+    )
+    latencies.sort()
+    guesses = len(latencies)
+    print(f"{guesses} guesses in {elapsed:.2f} s over {args.connections} connections "
+          f"x {args.pipeline} games: "
+          f"{guesses / elapsed:.0f} guesses/s")
+    print(f"Games won {counts['won']}, lost {counts['lost']}")
+    if latencies:
+        print("Latency (us): " + "  ".join(
+            f"{name} {percentile(latencies, fraction) * 1e6:.0f}"
+            for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0))
+        ))
+
+
+# --- Main ---
+if __name__ == "__main__":
+    main()
@@ -3,27 +3,21 @@ This is going to be a gameboy-like Mastermind.
 """
 
 # --- Imports ---
-import os, random, sys                          # Standard imports
-from enum import Enum
+import time                                     # Standard imports
+STARTED = time.perf_counter()                   # For --startup-profile
+
+import argparse, json, os, random, sys
+from collections import OrderedDict
 
 import pygame                                   # 3rd Party imports
 import color_codes as cc
 
-# --- Globals --        
-pygame.init()                                   # Initialise Pygame
+from engine import Game, Session, Patterns, EMPTY, CACHE_DIR   # Local imports
+from profiler import FrameProfiler
 
+# --- Globals --        
 WIDTH = 160                                     # Gameboy dimensions
 HEIGHT = 144
-WIN = pygame.display.set_mode((WIDTH, HEIGHT))  # Init screen
-pygame.display.set_caption("Mastermind")        # Set caption
-
-# Icon loader
-icon_path = "..\\assets\\icon.png"
-if os.path.exists(icon_path):                   # Safely check if icon is in cwd
-    icon = pygame.image.load(icon_path, "img")  # Load image
-    pygame.display.set_icon(icon)               # Set as icon       
-else:                                           # Warn on file not found
-    print("Icon Load failed. Check you are in the right working directory.")
 
 # Colours
 BG = cc.BLACK.rgb
@@ -31,27 +25,55 @@ FG = cc.EARTH_GREEN.rgb
 
 # Consts
 SIZE = 20   # The size in px of each block
-
-# Fonts
-pygame.font.init()                          # Initialise fonts module
-TITLE = pygame.font.SysFont("serif", 24)    # Load different font sizes
-OPTION = pygame.font.SysFont("serif", 16)
-TEXT = pygame.font.SysFont("serif", 8)
+BG_CACHE_SIZE = 8   # Max number of pre-rendered backgrounds kept around
+TEXT_CACHE_SIZE = 64    # Max number of rendered text Surfaces kept around
+FPS = 60            # Frame cap while the player is active
+IDLE_TIMEOUT = 500  # ms to block waiting for input when nothing is animating
+KEY_REPEAT_DELAY = 300      # ms before a held key starts repeating (0 turns repeat off)
+KEY_REPEAT_INTERVAL = 125   # ms between repeats of a held key
+DIRTY_RECTS = True  # Only repaint the parts of the screen that changed
+COLOURKEY = (255, 0, 255)   # Transparent colour for tiles that do not fill their box
+SCALE = 4           # Whole-number scale the window opens at
+
+# Paths, relative to this file so the game runs from any directory
+HERE = os.path.dirname(os.path.abspath(__file__))
+ICON_PATH = os.path.join(HERE, "..", "assets", "icon.png")
+FONT_CACHE = os.path.join(CACHE_DIR, "fonts.json")  # System font name -> file
+
+FONT_NAME = "serif"
+
+# Screen and renderers. These are set up by init() rather than at
+# import time, so importing this module does not open a window.
+# Everything is drawn to WIN at the native 160x144, which present()
+# scales up into SCALED, the part of the WINDOW it fits in.
+WIN = None
+WINDOW = SCALED = None
+zoom = 1                # Scale WIN is shown at
+offset = (0, 0)         # Top left of SCALED in the window
+br = atlas = texts = None
+
+# Keys mapped to the input actions they trigger
+KEYMAP = {
+    pygame.K_UP: "up",
+    pygame.K_DOWN: "down",
+    pygame.K_LEFT: "left",
+    pygame.K_RIGHT: "right",
+    pygame.K_z: "select",
+    pygame.K_RETURN: "enter",
+    pygame.K_ESCAPE: "back",
+    pygame.K_h: "hint",
+    pygame.K_r: "reveal",
+    pygame.K_F3: "overlay"
+}
+
+# Where the perf overlay is drawn
+OVERLAY_RECT = pygame.Rect(WIDTH - 82, 0, 82, 31)
+
+# Patterns by value, to turn board values into tiles
+PATTERNS = list(Patterns)
 
 # --- Other classes --
 
-# Block patterns enum
-class Patterns(Enum):
-    """
-    Holds the patterns for rendering blocks to the screen from
-    the board, includes box patterns and the up arrow.
-    """
-    blank = 0
-    vertical = 1
-    horizontal = 2
-    fill = 3
-    uparrow = 4
-
 class BoxRenderer:
     """
     This is the main graphical rendering part of the game.
@@ -64,12 +86,15 @@ class BoxRenderer:
         of BR.        
         """
         self.screen = screen
+        self.bg_cache = OrderedDict()   # LRU of pre-rendered backgrounds
+        self.calls = 0                  # Primitives drawn, for the perf overlay
 
     def fgborder(self, x, y, w, h):
         """
         Draws a box border at (x, y) of widthxheight wxh
         with the foreground colour that has no fill
         """
+        self.calls += 1
         pygame.draw.line(self.screen, FG, (x, y), (x + w, y))
         pygame.draw.line(self.screen, FG, (x + w, y), (x + w, y + h))
         pygame.draw.line(self.screen, FG, (x + w, y + h), (x, y + h))
@@ -80,6 +105,7 @@ class BoxRenderer:
         Draws a box at (x, y) of widthxheight wxh
         with the background colour that has no fill
         """
+        self.calls += 1
         pygame.draw.line(self.screen, BG, (x, y), (x + w, y))
         pygame.draw.line(self.screen, BG, (x + w, y), (x + w, y + h))
         pygame.draw.line(self.screen, BG, (x + w, y + h), (x, y + h))
@@ -90,6 +116,7 @@ class BoxRenderer:
         Draws a box at (x, y) of widthxheight wxh
         with the foreground colour that has no fill
         """
+        self.calls += 1
         rect = pygame.rect.Rect(x, y, w, h)
         pygame.draw.rect(self.screen, BG, rect)
         self.fgborder(x, y, w, h)
@@ -100,6 +127,7 @@ class BoxRenderer:
         with the foreground colour that has fill of
         foreground colour
         """
+        self.calls += 1
         self.fgborder(x, y, w, h)
         rect = pygame.rect.Rect(x, y, w, h)
         pygame.draw.rect(self.screen, FG, rect)
@@ -109,6 +137,7 @@ class BoxRenderer:
         Draws a box at (x, y) with widthxheight wxh with
         a border and vertical lines in the foreground colour.
         """
+        self.calls += 1
         rect = pygame.rect.Rect(x, y, w, h)
         pygame.draw.rect(self.screen, BG, rect)
         self.fgborder(x, y, w, h)
@@ -125,6 +154,7 @@ class BoxRenderer:
         Draws a box at (x, y) with widthxheight wxh with
         a border and horizontal lines in the foreground colour.
         """
+        self.calls += 1
         rect = pygame.rect.Rect(x, y, w, h)
         pygame.draw.rect(self.screen, BG, rect)
         self.fgborder(x, y, w, h)
@@ -141,10 +171,11 @@ class BoxRenderer:
         Draws a small border in the centre of a box at
         (x,y) wxh with size of size.
         """
+        self.calls += 1
         tlx = x + ((w - size) // 2)      # Top left offsets
         tly = y + ((h - size) // 2)
         rect = pygame.rect.Rect(tlx, tly, size, size)
-        pygame.draw.rect(WIN, BG, rect)
+        pygame.draw.rect(self.screen, BG, rect)
         pygame.draw.line(self.screen, FG, (tlx, tly), (tlx + size, tly))
         pygame.draw.line(self.screen, FG, (tlx + size, tly), (tlx + size, tly + size))
         pygame.draw.line(self.screen, FG, (tlx + size, tly + size), (tlx, tly + size))
@@ -155,6 +186,7 @@ class BoxRenderer:
         Draws a small border and fill in the centre of a box at
         (x,y) wxh with size of size.
         """
+        self.calls += 1
         self.little_border(x, y, w, h, size)
 
         tlx = x + ((w - size) // 2)      # Top left offsets
@@ -167,18 +199,21 @@ class BoxRenderer:
         Draws a small dot in the centre of a box at
         (x,y) wxh with size of 3.
         """
+        self.calls += 1
         self.little_fill(x, y, w, h, 3)
 
     def _single_dot(self, x, y, col):
         """
         Draws a single dot at certain coordinates.
         """
+        self.calls += 1
         pygame.draw.line(self.screen, col, (x, y), (x, y))
 
     def arrow(self, x, y, col):
         """
         Draw an arrow at the top of a box.
         """
+        self.calls += 1
         point1 = (x + 10, y + 2)
         point2 = (x + 5, y + 7)
         point3 = (x + 15, y + 7)
@@ -192,272 +227,637 @@ class BoxRenderer:
         Was going to be a gradient but ended up being something
         quite cool. Not sure how that happened.
 
-        Is a cool background.
+        Is a cool background. It takes thousands of line draws, so it is
+        rendered once per (x, y, w, h, col1, col2) and blitted after that.
+        """
+        self.calls += 1
+        self.screen.blit(self.cached_background(x, y, w, h, col1, col2), (x, y))
+
+    def cached_background(self, x, y, w, h, col1, col2):
         """
-        bgrect = pygame.rect.Rect(x, y, w, h)
-        pygame.draw.rect(self.screen, col1, bgrect)
+        Returns the pre-rendered background Surface, rendering it
+        if it is not in the cache.
+        """
+        key = (x, y, w, h, col1, col2)
+        surface = self.bg_cache.get(key)
+        if surface is None:                         # Not cached yet, so render it
+            surface = self._render_background(w, h, col1, col2)
+            self.bg_cache[key] = surface
+            if len(self.bg_cache) > BG_CACHE_SIZE:  # Drop least recently used
+                self.bg_cache.popitem(last=False)
+        else:
+            self.bg_cache.move_to_end(key)          # Mark as recently used
+
+        return surface
+
+    def _render_background(self, w, h, col1, col2):
+        """
+        Renders the background pattern of size wxh onto a new
+        off-screen Surface with the same pixel format as the screen.
+        """
+        surface = pygame.Surface((w, h), 0, self.screen)
+        surface.fill(col1)
 
         for row in range(h):
             n = h - (h - row)
             for i in range(n):
                 l = ((w)/(n))
                 pygame.draw.line(
-                    self.screen,
+                    surface,
                     col2,
                     ((i*l), row),
                     ((i*l) + l - 1.3, row)
                 )
 
+        return surface
+
+
+class TileAtlas:
+    """
+    Holds a pre-rendered tile for every Patterns value and score peg
+    so the board can be drawn with plain blits instead of going through
+    the BoxRenderer line draws for every cell on every frame.
+    """
+    def __init__(self, screen: pygame.Surface):
+        """
+        Take in the screen so the tiles can share its pixel format.
+        The tiles are built lazily on first use.
+        """
+        self.screen = screen
+        self.colours = None     # (FG, BG) the tiles were last built with
+        self.tiles = {}
+        self.blits = 0          # Tiles blitted, for the perf overlay
+
+    def _tile(self, keyed):
+        """
+        Makes an empty tile. Boxes are SIZE + 1 wide because their
+        border is drawn at x + w. Keyed tiles are transparent where
+        nothing gets drawn so the background shows through.
+        """
+        surface = pygame.Surface((SIZE + 1, SIZE + 1), 0, self.screen)
+        if keyed:
+            surface.fill(COLOURKEY)
+            surface.set_colorkey(COLOURKEY, pygame.RLEACCEL)
+        return surface
+
+    def build(self):
+        """
+        (Re)builds every tile with the current FG and BG colours.
+        """
+        self.tiles = {}
+
+        # Board patterns, drawn the same way BoxRenderer draws them
+        for pattern in Patterns:
+            tile = self._tile(keyed=pattern == Patterns.uparrow)
+            renderer = BoxRenderer(tile)
+            match pattern:
+                case Patterns.blank:
+                    renderer.blank(0, 0, SIZE, SIZE)
+                case Patterns.fill:
+                    renderer.fill(0, 0, SIZE, SIZE)
+                case Patterns.horizontal:
+                    renderer.horizontal(0, 0, SIZE, SIZE)
+                case Patterns.vertical:
+                    renderer.vertical(0, 0, SIZE, SIZE)
+                case Patterns.uparrow:
+                    renderer.arrow(0, 0, FG)
+            self.tiles[pattern] = tile
+
+        # Score pegs
+        for kind in ("fill", "blank", "dot"):
+            tile = self._tile(keyed=True)
+            renderer = BoxRenderer(tile)
+            match kind:
+                case "fill":
+                    renderer.little_fill(0, 0, SIZE, SIZE, 10)
+                case "blank":
+                    renderer.little_border(0, 0, SIZE, SIZE, 10)
+                case "dot":
+                    renderer.little_dot(0, 0, SIZE, SIZE)
+            self.tiles[kind] = tile
+
+        self.colours = (FG, BG)
+
+    def get(self, kind):
+        """
+        Returns the tile for a Patterns value or score peg name,
+        rebuilding the atlas first if the colours have changed.
+        """
+        if self.colours != (FG, BG):
+            self.build()
+        return self.tiles[kind]
+
+    def draw(self, cells):
+        """
+        Blits a sequence of (kind, (x, y)) cells to the screen in one
+        batched call. Empty (None) cells are skipped.
+        """
+        batch = [(self.get(kind), pos) for kind, pos in cells if kind is not None]
+        self.blits += len(batch)
+        if hasattr(self.screen, "fblits"):      # pygame-ce has the faster fblits
+            self.screen.fblits(batch)
+        else:
+            self.screen.blits(batch, False)
+
+
+class TextCache:
+    """
+    Font rendering is one of the slowest things pygame does, so this
+    keeps the Surfaces of recently rendered text around, converted to
+    the screen's pixel format.
+    """
+    def __init__(self, screen: pygame.Surface):
+        """
+        Take in the screen so rendered text can be converted to its format.
+        """
+        self.screen = screen
+        self.cache = OrderedDict()      # LRU of rendered text
+
+    def render(self, font, text, antialias, fg, bg=None):
+        """
+        Same as font.render(text, antialias, fg, bg), but only renders
+        each (font, text, antialias, fg, bg) once.
+        """
+        key = (font, text, antialias, fg, bg)
+        surface = self.cache.get(key)
+        if surface is None:                         # Not cached yet, so render it
+            surface = font.render(text, antialias, fg, bg).convert(self.screen)
+            self.cache[key] = surface
+            if len(self.cache) > TEXT_CACHE_SIZE:   # Drop least recently used
+                self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(key)             # Mark as recently used
+        return surface
+
+
+# --- Fonts ---
+def font_path(name):
+    """
+    Finds the file of a system font. Looking through the system fonts
+    is slow (it runs fc-list on Linux), so the answer is kept in
+    FONT_CACHE and only looked up again if the file goes missing.
+    None means pygame's default font.
+    """
+    try:
+        with open(FONT_CACHE) as file:
+            cache = json.load(file)
+    except (OSError, ValueError):                   # No cache yet, or a broken one
+        cache = {}
+
+    path = cache.get(name)
+    if name in cache and (path is None or os.path.exists(path)):
+        return path
+
+    path = pygame.font.match_font(name)             # The slow part
+    cache[name] = path
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(FONT_CACHE, "w") as file:
+            json.dump(cache, file)
+    except OSError:                                 # Fine, just slower next time
+        pass
+    return path
+
+
+class LazyFont:
+    """
+    A pygame Font that is only loaded the first time it is used,
+    so fonts never used (or not used yet) cost nothing at startup.
+    """
+    def __init__(self, name, size):
+        """
+        Remember which font to load.
+        """
+        self.name = name
+        self.size = size
+        self.font = None
+
+    def load(self):
+        """
+        Returns the real Font, loading it if needed.
+        """
+        if self.font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()                  # Initialise fonts module
+            self.font = pygame.font.Font(font_path(self.name), self.size)
+        return self.font
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+
+# Fonts
+TITLE = LazyFont(FONT_NAME, 24)     # Load different font sizes
+OPTION = LazyFont(FONT_NAME, 16)
+TEXT = LazyFont(FONT_NAME, 8)
+
+# --- Setup ---
+def init(scale=SCALE):
+    """
+    Initialises pygame, opens the window at scale times the native
+    size and loads the icon and renderers. Called once before the
+    game starts.
+    """
+    global WIN, br, atlas, texts
+
+    pygame.display.init()                           # Only the parts of pygame we use
+    window = pygame.display.set_mode((WIDTH * scale, HEIGHT * scale), pygame.RESIZABLE)
+    pygame.display.set_caption("Mastermind")        # Set caption
+    WIN = pygame.Surface((WIDTH, HEIGHT), 0, window)    # Native frame, drawn to off screen
+    resize()
 
-# Initialise BoxRenderer instance
-br = BoxRenderer(WIN)
+    # Icon loader
+    if os.path.exists(ICON_PATH):                   # Safely check the icon is there
+        icon = pygame.image.load(ICON_PATH, "img")  # Load image
+        pygame.display.set_icon(icon)               # Set as icon
+    else:                                           # Warn on file not found
+        print(f"Icon Load failed. {ICON_PATH} is missing.")
+
+    # Initialise BoxRenderer, TileAtlas and TextCache instances
+    br = BoxRenderer(WIN)
+    atlas = TileAtlas(WIN)
+    texts = TextCache(WIN)
+
+
+def resize():
+    """
+    Fits the biggest whole-number scale of the frame in the middle of
+    the window. Called by init and when the window is resized.
+    """
+    global WINDOW, SCALED, zoom, offset
+
+    WINDOW = pygame.display.get_surface()
+    width, height = WINDOW.get_size()
+    zoom = max(1, min(width // WIDTH, height // HEIGHT))
+    offset = (max(0, (width - WIDTH * zoom) // 2), max(0, (height - HEIGHT * zoom) // 2))
+    WINDOW.fill(BG)                                 # Border round the frame
+    area = pygame.Rect(offset, (WIDTH * zoom, HEIGHT * zoom)).clip(WINDOW.get_rect())
+    SCALED = WINDOW.subsurface(area)                # Made once per size, not per frame
+
+
+def present(rects=None):
+    """
+    Scales WIN up into the window in one pass and updates the display,
+    either all of it or just rects (given in native pixels).
+    """
+    pygame.transform.scale(WIN, SCALED.get_size(), SCALED)     # Nearest neighbour
+    if rects is None:
+        pygame.display.flip()
+    else:
+        x, y = offset
+        pygame.display.update([
+            pygame.Rect(x + rect.x * zoom, y + rect.y * zoom, rect.w * zoom, rect.h * zoom)
+            for rect in rects
+        ])
+
+def check_fits(config):
+    """
+    Raises ValueError if a board of this engine.Config cannot be drawn:
+    there is a tile for each pattern but the arrow, the score pegs go
+    right of the board and the reveal goes under it, all in WIDTH x HEIGHT.
+    """
+    if config.colours > len(PATTERNS) - 1:
+        raise ValueError(f"{config}: only {len(PATTERNS) - 1} patterns can be drawn")
+    if config.pegs * 2 * SIZE > WIDTH:
+        raise ValueError(f"{config}: {config.pegs} boxes and their score pegs do not fit {WIDTH} px")
+    if config.rows * SIZE + SIZE > HEIGHT:
+        raise ValueError(f"{config}: {config.rows} rows and the reveal do not fit {HEIGHT} px")
 
 # --- Main game class ---
 class Mastermind:
     """
-    This is the main Mastermind game class.
+    This is the main Mastermind game class. It draws an engine.Game
+    with pygame and feeds it the player's input.
     """
-    def __init__(self):
-        """
-        Load the initial game variables and call main
-        """
-        self.board = [
-            [Patterns.blank, Patterns.blank, Patterns.blank, Patterns.blank],
-            [None, None, None, None],
-            [None, None, None, None],
-            [None, None, None, None],
-            [None, None, None, None],
-            [None, None, None, None],
-            [None, None, None, None]    # Buffer row for arrow
-        ]
+    def __init__(self, game=None, profiler=None, session=None):
+        """
+        Load the initial game variables. Call main to start playing.
+        A session (for a replay) or just its game can be passed in.
+        """
+        self.session = session if session is not None else Session(game)  # Screens and rules
+        check_fits(self.game.config)    # Only the sizes the layout has room for
+
+        self.profiler = profiler if profiler is not None else FrameProfiler()
+        self.show_overlay = False   # Perf overlay, toggled with F3
 
-        self.pattern = []                   # Clear pattern array
-        for i in range(4):                  # For a width of 4,
-            index = random.randint(0, 3)    # Get random pattern index
-            match index:                    # Match index and add to pattern
-                case 0:
-                    self.pattern.append(Patterns.blank)
-                case 1:
-                    self.pattern.append(Patterns.vertical)
-                case 2:
-                    self.pattern.append(Patterns.horizontal)
-                case 3:
-                    self.pattern.append(Patterns.fill)
-
-        # Other var inits
-        self.current_row = 0
-        self.current_col = 0
-
-        self.option = 0
-
-        self.scores = []
-
-        self.game_ended = False
-
-        self.won = False
-
-        # Call main
-        self.main()
-
-    def check_row(self, row):
-        """
-        Checks the row and adds the scores to a scores list to draw
-        """
-        # Counting arrays for the types of scoring pegs
-        # So that they can be ordered after
-        fills = []
-        blanks = []
-        dots = []
-
-        # Counts the number of each pattern in the target pattern
-        num_patterns = {
-            Patterns.blank: self.pattern.count(Patterns.blank),
-            Patterns.fill: self.pattern.count(Patterns.fill),
-            Patterns.horizontal: self.pattern.count(Patterns.horizontal),
-            Patterns.vertical: self.pattern.count(Patterns.vertical)
-        }
-
-        # Iterate through the row and if the patterns covered count for something is
-        # More than 0, append the score then decrease the count. The count helps to
-        # Keep the scoring more in line with a more human way of thinking.
-        for i, box in enumerate(self.board[row]):
-            if self.pattern[i] == self.board[row][i] and num_patterns[self.pattern[i]] > 0:
-                fills.append("fill")
-                num_patterns[self.pattern[i]] -= 1
-            elif self.board[row][i] in self.pattern and num_patterns[self.pattern[i]] > 0:
-                blanks.append("blank")
-                num_patterns[self.pattern[i]] -= 1
-            else:
-                dots.append("dot")
-        
-        # Checks the win
-        if fills == ["fill", "fill", "fill", "fill"]:
-            self.game_ended = True  # The game has ended
-            self.won = True         # AND the user has won
-
-        # Set score and append it to scores array to draw
-        score = [] + fills + blanks + dots
-        self.scores.append(score)
-        
-
-    def main(self):
-        """
-        Main function
-        """
-        state = "menu"                          # State machine 
-        running = True
+        self.last_frame = None  # Snapshot of what was last drawn, for dirty rects
+
+        self.animating = False  # Keep rendering every frame instead of idling
+
+        self.capture = None     # capture.FrameCapture the shown frames go to
+
+        self.stats = None       # stats.StatsStore finished games are saved to
+        self.started = None     # When the game being played was started
+
+        self.screens = {}       # Pre-composed static screens
+        self.screens_colours = None     # (FG, BG) they were composed with
+
+    @property
+    def game(self):
+        """
+        The engine.Game being played.
+        """
+        return self.session.game
+
+    @property
+    def option(self):
+        """
+        The selected menu option.
+        """
+        return self.session.option
+
+    def main(self, startup_profile=False, recorder=None, capture=None, stats=None):
+        """
+        Main function. With startup_profile, print how long it took
+        to get to the first frame and quit. Input actions are written
+        to recorder (a replay.Recorder) if one is given, and the frames
+        shown to capture (a capture.FrameCapture). Finished games are
+        saved to stats (a stats.StatsStore).
+        """
+        self.capture = capture
+        self.stats = stats
+        state = self.session.state              # State machine 
         clock = pygame.time.Clock()             # Clock for fps
+        pygame.key.set_repeat(KEY_REPEAT_DELAY, KEY_REPEAT_INTERVAL)
+
+        profiler = self.profiler
+        first_frame = True
+        tick = 0                                # Loop count, to time recorded input
 
         # Main loop
-        while running:
+        while state != "exit":
             # --- Poll events ---
-            for event in pygame.event.get():    # Get all events
-                if event.type == pygame.QUIT:   # If the big 'X' pressed
-                    running = False             # Quit
-                    pygame.quit()
-                    sys.exit()
-
-            if self.current_row < 6:            # Clear where the arrow is before redraw
-                self.board[self.current_row + 1][self.current_col] = None
-
-            keys = pygame.key.get_pressed()     # Get all pressed keys
-            # Scroll the menu
-            if state == "menu":                 # Menu controls for navigation
-                if keys[pygame.K_UP]:
-                    if self.option > 0:
-                        self.option -= 1
-                if keys[pygame.K_DOWN]:
-                    if self.option < 2:
-                        self.option += 1
-                if keys[pygame.K_z]:
-                    if self.option == 0:
-                        state = "game"          # Example of changing state on select
-                    elif self.option == 1:
-                        state = "controls"
-                    elif self.option == 2:
-                        running = False
-                        pygame.quit()
-                        sys.exit()
-            
-            if state != "menu":             # Allow escape to be used on any non menu
-                if keys[pygame.K_ESCAPE]:
-                    if state == "game":     # Reset vars on esc
-                        self.board = [
-                            [Patterns.blank, Patterns.blank, Patterns.blank, Patterns.blank],
-                            [None, None, None, None],
-                            [None, None, None, None],
-                            [None, None, None, None],
-                            [None, None, None, None],
-                            [None, None, None, None],
-                            [None, None, None, None]    # Buffer row for arrow
-                        ]
-                        self.current_col = 0
-                        self.current_row = 0
-
-                        self.pattern = []
-                        for i in range(4):
-                            index = random.randint(0, 3)
-                            match index:
-                                case 0:
-                                    self.pattern.append(Patterns.blank)
-                                case 1:
-                                    self.pattern.append(Patterns.vertical)
-                                case 2:
-                                    self.pattern.append(Patterns.horizontal)
-                                case 3:
-                                    self.pattern.append(Patterns.fill)
-
-                        self.scores = []
-
-                        self.game_ended = False
-
-                        self.won = False
-
-                    state = "menu"
-            
-            # Main game controls
-            if state == "game":
-                if keys[pygame.K_LEFT]:         # Go left a col
-                    if self.current_col > 0:
-                        self.current_col -= 1
-                if keys[pygame.K_RIGHT]:        # Go right a col
-                    if self.current_col < 3:
-                        self.current_col += 1
-                if keys[pygame.K_RETURN]:       # Enter row
-                    if self.current_row <= 5:   # Check win
-                        self.check_row(self.current_row)
-                    if self.current_row < 5:    # If not the last row                
-                        self.current_row += 1   # Change row and col ptrs
-                        self.current_col = 0    # and add clear row
-                        self.board[self.current_row] = [
-                            Patterns.blank, 
-                            Patterns.blank, 
-                            Patterns.blank, 
-                            Patterns.blank
-                        ]
-                    elif self.current_row == 5: # If last row (final guess)
-                        self.current_row += 1   # Add a clear line below 
-                        self.board[self.current_row] = [None, None, None, None]
-                        self.game_ended = True  # End game
-                if keys[pygame.K_z]:    # Change the pattern stored at current selection
-                    match self.board[self.current_row][self.current_col]:
-                        case Patterns.blank:
-                            self.board[self.current_row][self.current_col] = Patterns.horizontal
-                        case Patterns.horizontal:
-                            self.board[self.current_row][self.current_col] = Patterns.vertical
-                        case Patterns.vertical:
-                            self.board[self.current_row][self.current_col] = Patterns.fill
-                        case Patterns.fill:
-                            self.board[self.current_row][self.current_col] = Patterns.blank
+            if self.animating or first_frame:   # Do not block, draw straight away
+                events = []
+            else:                               # Sleep until input arrives or timeout
+                events = [pygame.event.wait(IDLE_TIMEOUT)]
+
+            profiler.begin_frame()              # Time spent waiting is not frame time
+            with profiler.phase("events"):
+                events += pygame.event.get()
+
+            for event in events:
+                if event.type == pygame.VIDEORESIZE:    # Window resized, rescale
+                    resize()
+                    self.last_frame = None      # Repaint it all at the new size
+                elif event.type == pygame.QUIT: # If the big 'X' pressed
+                    state = "exit"              # Quit
+                elif event.type == pygame.KEYDOWN and event.key in KEYMAP:
+                    action = KEYMAP[event.key]
+                    phase = "update" if action in ("enter", "hint") else "input"
+                    with profiler.phase(phase):
+                        state = self.handle(action)
+                    if recorder is not None and action != "overlay":
+                        recorder.record(tick, action)
+                if state == "exit":
+                    break
+            if state == "exit":
+                break
 
             # --- Drawing ---
-            WIN.fill(BG)    # Fill with bg col
-            
+            br.calls = atlas.blits = 0
+            self.render(state)              # Draw and update screen
+            profiler.count("draw_calls", br.calls)
+            profiler.count("blits", atlas.blits)
+            profiler.end_frame()
+
+            if first_frame:
+                first_frame = False
+                if startup_profile:
+                    print(f"First frame {(time.perf_counter() - STARTED) * 1000:.1f} ms after start")
+                    state = "exit"
+
+            clock.tick(FPS)                 # Cap fps while active
+            tick += 1
+
+        if recorder is not None:
+            recorder.close(tick)
+        if stats is not None:
+            stats.close()                       # Write any games still queued
+        if capture is not None:
+            saved, dropped = capture.close()
+            print(f"Captured {saved} frames to {capture.path}, dropped {dropped}")
+        profiler.close()
+        pygame.quit()
+        sys.exit()
+
+    def handle(self, action):
+        """
+        Applies one input action (a value of KEYMAP). Each key press is
+        handled exactly once, so nothing double moves. The screens are
+        an engine.Session, only the overlay toggle lives here.
+        Returns the new state.
+        """
+        if action == "overlay":                 # Toggle the perf overlay anywhere
+            self.show_overlay = not self.show_overlay
+            self.animating = self.show_overlay  # Its numbers change every frame
+            self.last_frame = None              # Repaint all to add or remove it
+            return self.session.state
+        ended = self.game.game_ended
+        state = self.session.handle(action)
+        if state == "game":
+            self.session.track()                # Mask new rows now, not while drawing
+            if self.started is None:            # A fresh game is on screen
+                self.started = time.perf_counter()
+            if self.game.game_ended and not ended:  # Just finished, save it
+                if self.stats is not None:
+                    self.stats.record(self.game, time.perf_counter() - self.started)
+        else:
+            self.started = None                 # Left the game, so it was reset
+        return state
+
+    def arrow(self):
+        """
+        Returns the (row, col) the arrow sits at under the current row,
+        or None once the game has ended.
+        """
+        if self.game.game_ended:
+            return None
+        return (self.game.current_row + 1, self.game.current_col)
+
+    def snapshot(self, state):
+        """
+        Takes a copy of everything that decides what is on screen
+        for the given state, so frames can be compared for changes.
+        """
+        if state == "menu":
+            return (state, self.option)
+        if state == "game":
+            return (
+                state,
+                bytes(self.game.board),
+                tuple(self.game.feedback),
+                self.arrow(),
+                self.game.game_ended,
+                self.game.won,
+                self.session.track().count
+            )
+        return (state,)                     # Controls screen is static
+
+    def dirty_rects(self, old, new):
+        """
+        Works out which rects of the screen differ between two
+        snapshots. Returns None when the whole screen needs repainting.
+        """
+        if old is None or old[0] != new[0]:     # State transition, so repaint all
+            return None
+
+        rects = []
+        if new[0] == "menu":
+            if old[1] != new[1]:                # Selection moved, repaint option box
+                rects.append(pygame.Rect(30, 45, 98, 91))
+        elif new[0] == "game":
+            _, old_board, old_feedback, old_arrow, old_ended, old_won, old_count = old
+            _, board, feedback, arrow, ended, won, count = new
+            pegs, rows = self.game.config.pegs, self.game.config.rows
+            score_x = pegs * SIZE               # Score pegs go right of the board
+            reveal_y = rows * SIZE              # Pattern is revealed under the board
+            for index, value in enumerate(board):   # Changed cells
+                if old_board[index] != value:
+                    i, j = divmod(index, pegs)
+                    rects.append(pygame.Rect(j * SIZE, i * SIZE, SIZE + 1, SIZE + 1))
+            if old_arrow != arrow:              # Where the arrow was and is now
+                for pos in (old_arrow, arrow):
+                    if pos is not None:
+                        rects.append(pygame.Rect(pos[1] * SIZE, pos[0] * SIZE, SIZE + 1, SIZE + 1))
+            for i, row in enumerate(feedback):  # New or changed score rows
+                if i >= len(old_feedback) or old_feedback[i] != row:
+                    rects.append(pygame.Rect(score_x, i * SIZE, WIDTH - score_x, SIZE + 1))
+            if len(feedback) < len(old_feedback):   # Removed score rows
+                rects.append(pygame.Rect(score_x, 0, WIDTH - score_x, HEIGHT))
+            if old_ended != ended or old_won != won:    # Pattern reveal and WIN/LOSE
+                rects.append(pygame.Rect(0, reveal_y - 3, WIDTH, HEIGHT - reveal_y + 3))
+            elif old_count != count:            # Codes remaining counter
+                rects.append(pygame.Rect(score_x, reveal_y, WIDTH - score_x, HEIGHT - reveal_y))
+        return rects
+
+    def draw(self, state):
+        """
+        Draws the whole scene for the given state.
+        """
+        with self.profiler.phase("draw_" + state):
             if state == "menu":
-                self.draw_menu()    # Draw the menu
+                self.draw_menu()            # Draw the menu
             elif state == "game":
-                if self.current_row < 6:    # Add the arrow to the board
-                    self.board[self.current_row + 1][self.current_col] = Patterns.uparrow
                 self.draw_game()            # Draw the game
-            elif state == "controls":       
+            elif state == "controls":
                 self.draw_controls()        # Draw the controls screen
+            elif state == "stats":
+                self.draw_stats()           # Draw the stats screen
 
-            pygame.display.flip()           # Update screen
-            clock.tick(8)                   # 8 fps
+    def render(self, state):
+        """
+        Draws the frame and pushes it to the display. With DIRTY_RECTS
+        only the rects that changed since the last frame are repainted
+        and updated; state transitions repaint the whole screen.
+        """
+        frame = self.snapshot(state)
+        rects = None
+        if DIRTY_RECTS:
+            rects = self.dirty_rects(self.last_frame, frame)
+        self.last_frame = frame
+
+        if rects is not None and self.show_overlay:
+            rects.append(OVERLAY_RECT)  # The overlay changes every frame
+
+        if rects is None:               # Full repaint
+            WIN.fill(BG)                # Fill with bg col
+            self.draw(state)
+            self.draw_overlay()
+            with self.profiler.phase("display"):
+                present()               # Scale up and update screen
+        elif rects:                     # Repaint only what changed
+            for rect in rects:
+                WIN.set_clip(rect)      # Clip the normal draw to the dirty rect
+                self.draw(state)
+            WIN.set_clip(None)
+            self.draw_overlay()
+            with self.profiler.phase("display"):
+                present(rects)
+
+        if self.capture is not None and rects != []:    # A new frame was shown
+            self.capture.add(WIN)
+
+    def draw_overlay(self):
+        """
+        Draws the perf overlay when it is on: rolling frame time, the
+        slowest phase, and BoxRenderer calls and tile blits last frame.
+        """
+        if not self.show_overlay:
+            return
+        with self.profiler.phase("overlay"):
+            profiler = self.profiler
+            name, ms = profiler.slowest()
+            lines = [
+                f"frame {profiler.frame_time():.2f}ms",
+                f"{name} {ms:.2f}ms",
+                f"br {profiler.last('draw_calls')} tiles {profiler.last('blits')}"
+            ]
+            br.blank(*OVERLAY_RECT.topleft, OVERLAY_RECT.w - 1, OVERLAY_RECT.h - 1)
+            for i, line in enumerate(lines):    # Changes every frame, so not cached
+                WIN.blit(TEXT.render(line, False, FG, BG), (OVERLAY_RECT.x + 2, OVERLAY_RECT.y + 1 + i * 10))
+
+    def composite(self, key, compose, *args):
+        """
+        Returns a full screen Surface drawn by compose(surface, *args),
+        only composing it the first time it is asked for with this key.
+        Everything is recomposed if FG or BG change.
+        """
+        if self.screens_colours != (FG, BG):
+            self.screens = {}
+            self.screens_colours = (FG, BG)
+        surface = self.screens.get(key)
+        if surface is None:
+            surface = pygame.Surface((WIDTH, HEIGHT), 0, WIN)
+            compose(surface, *args)
+            self.screens[key] = surface
+        return surface
 
     def draw_menu(self):
         """
-        Drawing the menu function
+        Drawing the menu function. The menu looks the same every time
+        for each option, so it is one blit of a pre-composed screen.
+        """
+        WIN.blit(self.composite(("menu", self.option), self.compose_menu, self.option), (0, 0))
+
+    def compose_menu(self, surface, option):
+        """
+        Draws the menu with the given option selected onto surface.
         """
-        br.background(0, 0, WIDTH, HEIGHT, FG, BG)  # Draw background
+        surface.blit(br.cached_background(0, 0, WIDTH, HEIGHT, FG, BG), (0, 0))   # Draw background
 
         # Text variables
         titletxt = "MASTERMIND"
         playtxt = "Play"
         ctrltxt = "Controls"
+        statstxt = "Stats"
         exittxt = "Exit"
 
         # Depending on what is selected, indicate with a '>' prepended.
-        match self.option:
+        match option:
             case 0:
                 playtxt = "> " + playtxt
             case 1:
                 ctrltxt = "> " + ctrltxt
             case 2:
+                statstxt = "> " + statstxt
+            case 3:
                 exittxt = "> " + exittxt    
 
         # Render the texts
-        title = TITLE.render(titletxt, False, FG, BG)
-        play = OPTION.render(playtxt, False, FG, BG)
-        controls = OPTION.render(ctrltxt, False, FG, BG)
-        exit = OPTION.render(exittxt, False, FG, BG)
+        title = texts.render(TITLE, titletxt, False, FG, BG)
+        play = texts.render(OPTION, playtxt, False, FG, BG)
+        controls = texts.render(OPTION, ctrltxt, False, FG, BG)
+        stats = texts.render(OPTION, statstxt, False, FG, BG)
+        exit = texts.render(OPTION, exittxt, False, FG, BG)
 
         # Blit the texts to the screen as well as a box around it
-        WIN.blit(title, (0, 0))
-        br.blank(30, 45, 97, 70)
-        WIN.blit(play, (40, 50))
-        WIN.blit(controls, (40, 70))
-        WIN.blit(exit, (40, 90))
+        surface.blit(title, (0, 0))
+        BoxRenderer(surface).blank(30, 45, 97, 90)
+        surface.blit(play, (40, 50))
+        surface.blit(controls, (40, 70))
+        surface.blit(stats, (40, 90))
+        surface.blit(exit, (40, 110))
 
     def draw_game(self):
         """
@@ -468,83 +868,159 @@ class Mastermind:
 
     def draw_board(self):
         """
-        Draws the board to the screen by calling the BoxRenderer
-        based off of what values are stored in the board list.
-        """
-        for i, row in enumerate(self.board):        # Iter through board rows
-            y = i * 20                              # y coord offset for row
-            for j, column in enumerate(row):        # Iter through cols in row
-                x = j * 20                          # x coord offset for col in row
-                match column:                       # Draw at (x,y) the pattern
-                    case Patterns.blank:
-                        br.blank(x, y, SIZE, SIZE)
-                    case Patterns.fill:
-                        br.fill(x, y, SIZE, SIZE)
-                    case Patterns.horizontal:
-                        br.horizontal(x, y, SIZE, SIZE)
-                    case Patterns.vertical:
-                        br.vertical(x, y, SIZE, SIZE)
-                    case Patterns.uparrow:
-                        br.arrow(x, y, FG)
-
-        if self.scores != []:                       # If scores not empty
-            for i, row in enumerate(self.scores):   # Iter through score rows
-                y = i * 20                          # y offset for row
-                for j, column in enumerate(row):    # Iter through score cols in row
-                    x = (j * 20) + 80               # x offset for col in row
-                    match column:                   # Draw at (x,y) the correct score box
-                        case "fill":
-                            br.little_fill(x, y, SIZE, SIZE, 10)
-                        case "blank":
-                            br.little_border(x, y, SIZE, SIZE, 10)
-                        case "dot":
-                            br.little_dot(x, y, SIZE, SIZE)
-
-        if self.game_ended == True:                     # On game end
-            y = 120                                     # y offset for pattern
-            for j, column in enumerate(self.pattern):   # Iter through pattern
-                x = j * 20                              # x offset for pattern
-                match column:                           # Draw target pattern
-                    case Patterns.blank:
-                        br.blank(x, y, SIZE, SIZE)
-                    case Patterns.fill:
-                        br.fill(x, y, SIZE, SIZE)
-                    case Patterns.horizontal:
-                        br.horizontal(x, y, SIZE, SIZE)
-                    case Patterns.vertical:
-                        br.vertical(x, y, SIZE, SIZE)
-                    case Patterns.uparrow:
-                        br.arrow(x, y, FG)
-
-            if self.won:                                # If the game was won
-                msg = TITLE.render("WIN", False, FG, BG)    # WIN screen
-                WIN.blit(msg, (95, 117)) 
+        Draws the board to the screen by blitting the pre-rendered
+        tiles for what values are stored in the board.
+        """
+        game = self.game
+        score_x = game.config.pegs * SIZE           # Score pegs go right of the board
+        reveal_y = game.config.rows * SIZE          # Pattern is revealed under the board
+        cells = []
+        for i, row in enumerate(game.board):        # Iter through board rows
+            y = i * SIZE                            # y coord offset for row
+            for j, value in enumerate(row):         # Iter through cols in row
+                if value != EMPTY:                  # Row not reached yet
+                    x = j * SIZE                    # x coord offset for col in row
+                    cells.append((PATTERNS[value], (x, y)))     # Draw at (x,y) the pattern
+
+        arrow = self.arrow()                        # Arrow under the current box
+        if arrow is not None:
+            cells.append((Patterns.uparrow, (arrow[1] * SIZE, arrow[0] * SIZE)))
+
+        for i, row in enumerate(game.scores):       # Iter through score rows
+            y = i * SIZE                            # y offset for row
+            for j, column in enumerate(row):        # Iter through score cols in row
+                x = (j * SIZE) + score_x            # x offset for col in row
+                cells.append((column, (x, y)))      # Draw at (x,y) the score peg
+
+        if game.game_ended == True:                     # On game end
+            for j, value in enumerate(game.secret):     # Iter through pattern
+                x = j * SIZE                            # x offset for pattern
+                cells.append((PATTERNS[value], (x, reveal_y)))  # Draw target pattern
+
+        atlas.draw(cells)                           # Blit everything in one go
+
+        if game.game_ended == True:
+            if game.won:                                # If the game was won
+                msg = texts.render(TITLE, "WIN", False, FG, BG)     # WIN screen
+                WIN.blit(msg, (score_x + 15, reveal_y - 3))
             else:                                       # If the game was not won
-                msg = TITLE.render("LOSE", False, FG, BG)   # LOSE screen
-                WIN.blit(msg, (90, 117)) 
+                msg = texts.render(TITLE, "LOSE", False, FG, BG)    # LOSE screen
+                WIN.blit(msg, (score_x + 10, reveal_y - 3))
+        else:                                           # Codes that still fit the scores
+            msg = texts.render(TEXT, f"{self.session.track().count} codes remain", False, FG, BG)
+            WIN.blit(msg, (score_x + 2, reveal_y + 6))
 
 
     def draw_controls(self):
         """
-        Draw the stuff shown on the controls screen.
+        Draw the stuff shown on the controls screen, which is one blit
+        of a pre-composed screen.
+        """
+        WIN.blit(self.composite(("controls",), self.compose_controls), (0, 0))
+
+    def compose_controls(self, surface):
+        """
+        Draws the controls screen onto surface.
         """
         # This is all static rendering really, so it does not need much explanation.
-        br.background(0, 0, WIDTH, HEIGHT, FG, BG)
-        br.blank(5, (HEIGHT//3), WIDTH - 10, HEIGHT - 30 - (HEIGHT//3))
+        surface.blit(br.cached_background(0, 0, WIDTH, HEIGHT, FG, BG), (0, 0))
+        BoxRenderer(surface).blank(5, (HEIGHT//3), WIDTH - 10, HEIGHT - 15 - (HEIGHT//3))
         titletxt = "CONTROLS"
-        title = TITLE.render(titletxt, False, FG)
-        WIN.blit(title, (17, 7))
+        title = texts.render(TITLE, titletxt, False, FG)
+        surface.blit(title, (17, 7))
         optiontxt =  [
             "ESC | Go back",
             "<- -> | Change box",
             "Z | Cycle box type",
-            "ENTER | Enter row"
+            "ENTER | Enter row",
+            "H | Hint, R | Reveal"
         ]
         for height, item in enumerate(optiontxt):
-            line = OPTION.render(item, False, FG)
+            line = texts.render(OPTION, item, False, FG)
+            surface.blit(line, (10, (15*height)+(HEIGHT//3)))
+
+    def draw_stats(self):
+        """
+        Draw the stats screen for the board size being played. The
+        totals are kept up to date as games are saved, so reading them
+        is a couple of lookups however many games there are.
+        """
+        WIN.blit(br.cached_background(0, 0, WIDTH, HEIGHT, FG, BG), (0, 0))
+        br.blank(5, (HEIGHT//3), WIDTH - 10, HEIGHT - 15 - (HEIGHT//3))
+        title = texts.render(TITLE, "STATS", False, FG)
+        WIN.blit(title, ((WIDTH - title.get_width()) // 2, 7))
+
+        if self.stats is None:
+            lines = ["Not saving stats"]
+            histogram = None
+        else:
+            summary = self.stats.summary(self.game.config)
+            games, wins = summary["games"], summary["wins"]
+            lines = [
+                f"Played {games}",
+                f"Won {wins} ({wins / games:.0%})" if games else "Won 0",
+                f"Mean guesses {summary['won_guesses'] / wins:.2f}" if wins else "Mean guesses -",
+                f"Mean time {summary['duration'] / games:.0f}s" if games else "Mean time -"
+            ]
+            # Wins by guesses used, 1 to the last row
+            histogram = " ".join(
+                f"{used}:{summary['histogram'].get(used, 0)}"
+                for used in range(1, self.game.config.rows + 1)
+            )
+
+        for height, item in enumerate(lines):
+            line = texts.render(OPTION, item, False, FG)
             WIN.blit(line, (10, (15*height)+(HEIGHT//3)))
+        if histogram is not None:
+            WIN.blit(texts.render(TEXT, histogram, False, FG), (10, (15*len(lines))+(HEIGHT//3)+3))
 
 
 # --- Main ---
 if __name__ == "__main__":
-    Mastermind()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="A gameboy-like Mastermind.")
+    parser.add_argument("--profile-log", help="write per-frame timings to this .csv or .jsonl file")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="print the time to the first frame and quit")
+    parser.add_argument("--scale", type=int, default=SCALE, help="window size as a multiple of 160x144")
+    parser.add_argument("--seed", type=int, help="seed for the secret codes")
+    parser.add_argument("--record", help="record the input to this file, see replay.py")
+    parser.add_argument("--capture", help="save the frames shown to this .gif, or this folder as PNGs")
+    parser.add_argument("--capture-scale", type=int, default=1, help="size of the captured frames")
+    parser.add_argument("--no-stats", action="store_true", help="do not save finished games")
+    args = parser.parse_args()
+    if args.scale < 1:
+        parser.error("--scale must be at least 1")
+    if args.capture_scale < 1:
+        parser.error("--capture-scale must be at least 1")
+    if args.seed is not None and not 0 <= args.seed < 2 ** 64:
+        parser.error("--seed must be from 0 to 2**64 - 1")    # What a recording can hold
+
+    seed = args.seed if args.seed is not None else random.getrandbits(64)
+    game = Game(random.Random(seed))
+    recorder = None
+    if args.record:
+        from replay import Recorder
+        recorder = Recorder(args.record, seed, game.config)
+
+    imported = time.perf_counter()
+    init(args.scale)
+    ready = time.perf_counter()
+    if args.startup_profile:
+        print(f"Imports {(imported - STARTED) * 1000:.1f} ms, init {(ready - imported) * 1000:.1f} ms")
+    stats = None
+    if not args.no_stats:
+        import sqlite3
+        from stats import StatsStore
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            stats = StatsStore(os.path.join(CACHE_DIR, "stats.sqlite3"))
+        except (OSError, sqlite3.Error) as error:     # Play on without saving them
+            print(f"Not saving stats: {error}")
+    capture = None
+    if args.capture:
+        from capture import FrameCapture
+        try:
+            capture = FrameCapture(args.capture, WIN, args.capture_scale)
+        except RuntimeError as error:   # No Pillow for a GIF
+            print(error)
+    Mastermind(game, FrameProfiler(args.profile_log)).main(args.startup_profile, recorder, capture, stats)
\ No newline at end of file
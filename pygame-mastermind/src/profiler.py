@@ -0,0 +1,122 @@
+"""
+Times the phases of each frame of the main loop.
+
+The main loop wraps each phase of a frame in profiler.phase(name) and
+calls begin_frame/end_frame around it. Recent frames are kept for the
+on-screen overlay, and every frame can be streamed to a CSV or JSONL
+file (picked by the file extension) for looking at later.
+"""
+
+# --- Imports ---
+import csv, json, time                          # Standard imports
+from collections import deque
+from contextlib import contextmanager
+
+# --- Consts ---
+PHASES = (
+    "events", "input", "update",
+    "draw_menu", "draw_game", "draw_controls", "draw_stats", "overlay",
+    "display"
+)
+COUNTERS = ("draw_calls", "blits")
+
+# --- Classes ---
+
+class FrameProfiler:
+    """
+    Collects per-phase timings and counters for each frame.
+    """
+    def __init__(self, log_path=None, window=60):
+        """
+        window is how many recent frames the rolling stats cover.
+        If log_path is given, every frame is written to it.
+        """
+        self.recent = deque(maxlen=window)  # Recent frames, for the overlay
+        self.frames = 0
+        self.begin_frame()                  # So phases outside the loop still work
+
+        self.log = None
+        self.writer = None
+        if log_path is not None:
+            self.log = open(log_path, "w", newline="")
+            if log_path.endswith(".csv"):
+                self.writer = csv.writer(self.log)
+                self.writer.writerow(("frame", "time", "total_ms") + PHASES + COUNTERS)
+
+    def begin_frame(self):
+        """
+        Starts timing a new frame.
+        """
+        self.frame = dict.fromkeys(PHASES, 0.0)
+        self.frame.update(dict.fromkeys(COUNTERS, 0))
+        self.start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Adds the time spent in the with block to the named phase.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.frame[name] += time.perf_counter() - start
+
+    def count(self, name, n):
+        """
+        Adds n to one of the frame's COUNTERS.
+        """
+        self.frame[name] += n
+
+    def end_frame(self):
+        """
+        Finishes the frame, keeping it for the rolling stats and
+        writing it to the log.
+        """
+        total = time.perf_counter() - self.start
+        self.frame["total"] = total
+        self.recent.append(self.frame)
+        self.frames += 1
+
+        if self.log is not None:
+            ms = [round(self.frame[name] * 1000, 4) for name in PHASES]
+            counts = [self.frame[name] for name in COUNTERS]
+            if self.writer is not None:
+                self.writer.writerow([self.frames, round(time.time(), 4), round(total * 1000, 4)] + ms + counts)
+            else:
+                sample = {"frame": self.frames, "time": round(time.time(), 4), "total_ms": round(total * 1000, 4)}
+                sample.update(zip(PHASES, ms))
+                sample.update(zip(COUNTERS, counts))
+                self.log.write(json.dumps(sample) + "\n")
+
+    def frame_time(self):
+        """
+        Mean frame time in ms over the recent frames.
+        """
+        if not self.recent:
+            return 0.0
+        return sum(frame["total"] for frame in self.recent) / len(self.recent) * 1000
+
+    def slowest(self):
+        """
+        Returns (phase, mean ms) of the phase that took longest on
+        average over the recent frames.
+        """
+        if not self.recent:
+            return ("none", 0.0)
+        name = max(PHASES, key=lambda phase: sum(frame[phase] for frame in self.recent))
+        return (name, sum(frame[name] for frame in self.recent) / len(self.recent) * 1000)
+
+    def last(self, name):
+        """
+        Returns a counter or phase time of the last finished frame.
+        """
+        return self.recent[-1][name] if self.recent else 0
+
+    def close(self):
+        """
+        Flushes and closes the log.
+        """
+        if self.log is not None:
+            self.log.close()
+            self.log = None
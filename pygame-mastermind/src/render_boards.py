@@ -0,0 +1,154 @@
+"""
+Renders board states to PNG without a window, across a process pool.
+
+The input has one JSON object per line, for example:
+
+    {"name": "gameplay_1", "secret": [3, 1, 0, 2], "guesses": [[0, 0, 1, 1], [2, 2, 3, 3]],
+     "current": [3, 1, 0, 0], "col": 2}
+
+guesses are the rows already entered, in order. They are played into an
+engine.Game, so the score pegs, the reveal and WIN/LOSE come out exactly
+as in the game. current (the row being filled in) and col (the box the
+arrow is under, from 0) are optional. pegs, colours and rows can be
+given too, for smaller boards; sizes main.check_fits says do not fit
+160x144 are skipped. name is the file name (without any folders), or
+the line number if missing.
+
+Each worker opens pygame with the dummy video driver once and keeps its
+screen and surfaces for every board it draws. Images are saved by the
+workers as they are drawn.
+
+Usage:
+    python render_boards.py boards.jsonl --out ../../docs/assets --scale 2
+"""
+
+# --- Imports ---
+import argparse, json, os, random, time         # Standard imports
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import Game, Config, DEFAULT        # Local imports
+
+# --- Worker ---
+
+_worker = None      # (main module, scaled Surface or None, Mastermind per Config)
+
+
+def _init_worker(scale):
+    """
+    Opens pygame headless once when a worker process starts.
+    """
+    global _worker
+    os.environ["SDL_VIDEODRIVER"] = "dummy"             # No window needed
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    import pygame, main
+    main.init(1)
+    scaled = None
+    if scale != 1:                                      # Made once, reused for every board
+        scaled = pygame.Surface((main.WIDTH * scale, main.HEIGHT * scale), 0, main.WIN)
+    _worker = (main, scaled, {})
+
+
+def game_from(state):
+    """
+    Makes the engine.Game a state describes. Raises ValueError if it
+    is not a game the screen can draw.
+    """
+    from main import check_fits
+
+    config = Config(
+        state.get("pegs", DEFAULT.pegs),
+        state.get("colours", DEFAULT.colours),
+        state.get("rows", DEFAULT.rows)
+    )
+    check_fits(config)
+    game = Game(random.Random(0), config)
+    game.secret = bytes(state["secret"])
+    if len(game.secret) != config.pegs or max(game.secret) >= config.colours:
+        raise ValueError(f"not a secret for {config}: {state['secret']}")
+    for row in state.get("guesses", []):
+        game.submit(row)
+    if "current" in state:
+        game.fill_row(state["current"])
+    col = state.get("col", 0)
+    if not isinstance(col, int) or not 0 <= col < config.pegs:
+        raise ValueError(f"col must be 0 to {config.pegs - 1}: {col!r}")
+    game.current_col = col
+    return game
+
+
+def render(job):
+    """
+    Draws one (line number, state, out folder) job and saves it.
+    Returns (True, path written) or (False, why it was skipped), so
+    one bad line never stops the rest.
+    """
+    import pygame
+
+    index, state, out = job
+    main, scaled, screens = _worker
+    name = os.path.basename(str(state.get("name", "")))    # Never outside out
+    path = os.path.join(out, f"{name or f'{index:06d}'}.png")
+    try:
+        game = game_from(state)
+    except (KeyError, TypeError, ValueError) as error:
+        return False, f"line {index}: {error}"
+
+    try:
+        screen = screens.get(game.config)
+        if screen is None:                              # One per board size, kept
+            screen = screens[game.config] = main.Mastermind(game)
+        screen.session.game = game
+        screen.draw_game()                              # Draws its own background
+
+        frame = main.WIN
+        if scaled is not None:                          # Nearest neighbour, like the window
+            frame = pygame.transform.scale(main.WIN, scaled.get_size(), scaled)
+        pygame.image.save(frame, path)
+    except Exception as error:                          # Drawing or saving, skip just this one
+        return False, f"line {index}: {type(error).__name__}: {error}"
+    return True, path
+
+# --- Functions ---
+
+def jobs(path, out):
+    """
+    Reads the input a line at a time, as render jobs.
+    """
+    with open(path) as file:
+        for index, line in enumerate(file, 1):
+            if line.strip():
+                yield index, json.loads(line), out
+
+
+def run():
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description="Render Mastermind board states to PNG.")
+    parser.add_argument("boards", help="JSON lines file of board states")
+    parser.add_argument("--out", default=".", help="folder to save the images in")
+    parser.add_argument("--scale", type=int, default=1, help="size of the images as a multiple of 160x144")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(), help="processes to use")
+    parser.add_argument("--chunk", type=int, default=16, help="boards sent to a worker at a time")
+    args = parser.parse_args()
+    for flag in ("scale", "workers", "chunk"):
+        if getattr(args, flag) < 1:
+            parser.error(f"--{flag} must be at least 1")
+
+    os.makedirs(args.out, exist_ok=True)
+    start = time.perf_counter()
+    done = failed = 0
+    with ProcessPoolExecutor(args.workers, initializer=_init_worker, initargs=(args.scale,)) as pool:
+        for saved, message in pool.map(render, jobs(args.boards, args.out), chunksize=args.chunk):
+            if saved:
+                done += 1
+            else:
+                failed += 1
+                print(message)
+    elapsed = time.perf_counter() - start
+    print(f"Rendered {done} boards to {args.out} in {elapsed:.2f} s ({done / elapsed:.0f}/s), {failed} failed")
+
+
+# --- Main ---
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,192 @@
+"""
+Records the input of a game and plays it back exactly.
+
+A recording starts with a header holding the seed of the game's
+random stream and its Config. Then each input action is one record:
+the ticks (loops of the main loop) since the last action as a varint,
+and the action's place in engine.ACTIONS as one byte. The last record
+is END, at the tick the game was closed on.
+
+Replaying makes a Session from the same seed and feeds it the same
+actions, so it ends in the same state as the recorded game. This needs
+no pygame and runs as fast as the actions can be applied. Frames are
+only drawn for the ticks asked for.
+
+Usage:
+    python main.py --record bug.mmr
+    python replay.py bug.mmr
+    python replay.py bug.mmr --frames 10,50,120 --out frames
+    python replay.py bug.mmr --show
+"""
+
+# --- Imports ---
+import argparse, os, random, struct, time       # Standard imports
+
+from engine import Game, Session, Config, ACTIONS   # Local imports
+
+# --- Consts ---
+MAGIC = b"MMRP"
+VERSION = 2          # 2 added Stats to the menu, so option numbers changed
+HEADER = struct.Struct("<4sBQBBB")  # Magic, version, seed, pegs, colours, rows
+END = 0xFF                          # Action byte of the last record
+
+CODES = {action: i for i, action in enumerate(ACTIONS)}
+
+# --- Classes ---
+
+class Recorder:
+    """
+    Writes a recording as the game is played.
+    """
+    def __init__(self, path, seed, config):
+        """
+        Opens path and writes the header. seed is what the game's
+        random.Random was made from.
+        """
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed, *config))
+        self.last = 0           # Tick of the last record
+
+    def write(self, tick, code):
+        """
+        Writes one record: the tick delta as a varint then the code.
+        """
+        delta = tick - self.last
+        self.last = tick
+        out = bytearray()
+        while delta >= 0x80:                    # 7 bits a byte, low bits first
+            out.append(delta & 0x7F | 0x80)
+            delta >>= 7
+        out.append(delta)
+        out.append(code)
+        self.file.write(out)
+
+    def record(self, tick, action):
+        """
+        Records an action (a value of engine.ACTIONS) on a tick.
+        """
+        self.write(tick, CODES[action])
+
+    def close(self, tick):
+        """
+        Ends the recording at the tick the game stopped on.
+        """
+        self.write(tick, END)
+        self.file.close()
+
+# --- Functions ---
+
+def read(path):
+    """
+    Reads a recording. Returns (seed, Config, records) where records is
+    a list of (tick, action byte), ending with an END record.
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path} is too short to be a recording")
+    magic, version, seed, pegs, colours, rows = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a recording")
+    if version != VERSION:
+        raise ValueError(f"{path} is version {version}, only {VERSION} can be read")
+
+    records = []
+    tick = 0
+    i = HEADER.size
+    n = len(data)
+    while i < n:
+        delta = shift = 0
+        while True:                             # Varint tick delta
+            byte = data[i]
+            i += 1
+            delta |= (byte & 0x7F) << shift
+            shift += 7
+            if byte < 0x80:
+                break
+        tick += delta
+        code = data[i]
+        i += 1
+        if code != END and code >= len(ACTIONS):
+            raise ValueError(f"{path} has an unknown action {code} at tick {tick}")
+        records.append((tick, code))
+    if not records or records[-1][1] != END:    # Cut off, the game did not close
+        records.append((tick, END))
+    return seed, Config(pegs, colours, rows), records
+
+
+def replay(path, frames=(), draw=None):
+    """
+    Plays a recording back into a new Session as fast as it can.
+    draw(tick, session) is called for each tick in frames that the
+    recording reaches, with the session as it was at the end of that
+    tick. Returns (session, ticks, actions).
+    """
+    seed, config, records = read(path)
+    session = Session(Game(random.Random(seed), config))
+    frames = sorted(set(frames), reverse=True)  # Next frame to draw at the end
+
+    for tick, code in records:
+        while frames and frames[-1] < tick:     # Nothing changes between records
+            draw(frames.pop(), session)
+        if code == END:
+            break
+        session.handle(ACTIONS[code])
+    if frames and frames[-1] == tick:           # The last tick itself
+        draw(frames.pop(), session)
+
+    return session, tick, len(records) - 1
+
+
+def run():
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description="Play back a recorded Mastermind game.")
+    parser.add_argument("recording", help="file made with main.py --record")
+    parser.add_argument("--frames", default="", help="comma separated ticks to draw to PNG")
+    parser.add_argument("--out", default=".", help="folder for the drawn frames")
+    parser.add_argument("--show", action="store_true",
+                        help="draw every tick in a window, with no frame limiter")
+    args = parser.parse_args()
+
+    frames = [int(tick) for tick in args.frames.split(",") if tick]
+    draw = None
+    if frames or args.show:
+        if not args.show:
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")   # No window needed
+        os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+        import pygame
+        import main
+        main.init()
+        if args.show:
+            frames = range(read(args.recording)[2][-1][0] + 1)
+
+        screens = {}            # One Mastermind per session, so its caches last
+
+        def draw(tick, session):
+            if session.state == "exit":
+                return
+            pygame.event.pump()
+            if session not in screens:
+                screens[session] = main.Mastermind(session=session)
+            screens[session].render(session.state)
+            if not args.show:
+                pygame.image.save(main.WIN, os.path.join(args.out, f"frame{tick:06d}.png"))
+
+    start = time.perf_counter()
+    session, ticks, actions = replay(args.recording, frames, draw)
+    elapsed = time.perf_counter() - start
+
+    game = session.game
+    print(f"{actions} actions over {ticks} ticks of {game.config}")
+    print(f"Ended on {session.state}, {len(game.feedback)} rows entered, "
+          f"{'won' if game.won else 'ended' if game.game_ended else 'playing'}")
+    for row, (black, white) in zip(game.board, game.feedback):
+        print(f"  {list(row)} black {black} white {white}")
+    print(f"{ticks / elapsed:.0f} ticks/s, {actions / elapsed:.0f} actions/s ({elapsed * 1000:.1f} ms)")
+
+
+# --- Main ---
+if __name__ == "__main__":
+    run()
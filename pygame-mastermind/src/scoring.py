@@ -0,0 +1,69 @@
+"""
+Scores guesses against secrets with the standard Mastermind rules.
+
+Codes are sequences of ints, the values of engine.Patterns. A score
+is a (black, white) pair: black is a right pattern in the right box,
+white is a right pattern in the wrong box. score() is the scalar path
+used by the game, score_batch() scores whole arrays at once with NumPy.
+"""
+
+# --- Functions ---
+
+def score(guess, secret, colours=4):
+    """
+    Scores one guess against one secret. Returns (black, white).
+    """
+    black = 0
+    guess_counts = [0] * colours        # Patterns left over after exact matches
+    secret_counts = [0] * colours
+    for g, s in zip(guess, secret):
+        if g == s:
+            black += 1
+        else:
+            guess_counts[g] += 1
+            secret_counts[s] += 1
+
+    # Each leftover pattern can only be matched as many times as it is in both
+    white = 0
+    for g, s in zip(guess_counts, secret_counts):
+        white += g if g < s else s
+    return black, white
+
+
+def score_batch(guesses, secrets, colours=None):
+    """
+    Scores arrays of guesses against arrays of secrets in one go.
+
+    guesses and secrets are integer arrays whose last axis is the
+    pegs of a code, and the other axes broadcast against each other.
+    E.g. (N, P) with (N, P) scores N pairs, and (G, 1, P) with
+    (1, S, P) gives the full G x S table. Returns (black, white)
+    as uint8 arrays of the broadcast shape.
+    """
+    import numpy as np      # Imported here so the scalar path works without NumPy
+
+    guesses = np.asarray(guesses)
+    secrets = np.asarray(secrets)
+    if colours is None:
+        colours = int(max(guesses.max(), secrets.max())) + 1
+
+    black = (guesses == secrets).sum(axis=-1, dtype=np.uint8)
+
+    # Matches ignoring position are the sum over patterns of the lower count.
+    # The counts are taken before broadcasting, so a G x S table only
+    # compares the G and S codes with each pattern, not every pair.
+    total = np.zeros(black.shape, dtype=np.uint8)
+    for c in range(colours):
+        guess_count = (guesses == c).sum(axis=-1, dtype=np.uint8)
+        secret_count = (secrets == c).sum(axis=-1, dtype=np.uint8)
+        total += np.minimum(guess_count, secret_count)
+
+    return black, total - black
+
+
+def feedback_index(black, white, pegs=4):
+    """
+    Packs a (black, white) score into a single small int, which
+    works on plain ints and on the arrays from score_batch.
+    """
+    return black * (pegs + 1) + white
@@ -0,0 +1,289 @@
+"""
+Hosts lots of Mastermind games at once over TCP or a Unix socket.
+
+Every game is an engine.Game, so secrets are made and rows are scored
+exactly like in the pygame game. The protocol is one line per command
+and one line per reply, and commands can be sent without waiting for
+the reply to the one before:
+
+    NEW [pegs colours rows]   -> OK <id> <pegs> <colours> <rows>
+    GUESS <id> <code>         -> FB <black> <white> PLAY|WON|LOST [secret]
+    FEEDBACK <id>             -> ROWS PLAY|WON|LOST [<code>:<black>,<white> ...]
+    QUIT <id>                 -> OK
+    STATS                     -> STATS sessions=.. games=.. guesses=.. evicted=..
+
+A code is written as one digit per box, 0-9 then a-z for more colours.
+Anything wrong gets one of these, whatever Python runs the server:
+
+    ERR empty command
+    ERR unknown command <name>
+    ERR expected <n> arguments
+    ERR bad game id
+    ERR no game <id>
+    ERR NEW takes no sizes or pegs colours rows
+    ERR size out of range
+    ERR bad code
+    ERR game is over
+
+Games not touched for --idle seconds are dropped.
+
+Usage:
+    python server.py --port 7777
+    python server.py --unix /tmp/mastermind.sock
+"""
+
+# --- Imports ---
+import argparse, asyncio, random, time          # Standard imports
+from collections import OrderedDict
+
+from engine import Game, Config, DEFAULT        # Local imports
+
+# --- Consts ---
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+MAX_PEGS = 10
+MAX_ROWS = 20
+MAX_LINE = 1024             # Longest command a client may send
+
+# --- Classes ---
+
+class Hosted:
+    """
+    A game on the server and when it was last used.
+    """
+    __slots__ = ("game", "seen")
+
+    def __init__(self, game, seen):
+        self.game = game
+        self.seen = seen
+
+
+class Server:
+    """
+    The games being played and the commands that act on them.
+    Commands are plain functions of a line, so they need no socket.
+    """
+    def __init__(self, config=DEFAULT, idle=300, seed=None):
+        """
+        config is used for NEW without a size. Games idle for longer
+        than idle seconds are evicted.
+        """
+        self.config = config
+        self.idle = idle
+        self.rng = random.Random(seed)      # Shared by every game's secrets
+        self.sessions = OrderedDict()       # id -> Hosted, least recently used first
+        self.next_id = 1
+        self.games = self.guesses = self.evicted = 0
+
+    def command(self, line):
+        """
+        Runs one command line (bytes). Returns the reply line (bytes).
+        """
+        words = line.split()
+        if not words:
+            return b"ERR empty command\n"
+        name = words[0].upper()
+        try:
+            if name == b"GUESS":
+                reply = self.guess(words[1:])
+            elif name == b"NEW":
+                reply = self.new(words[1:])
+            elif name == b"FEEDBACK":
+                reply = self.feedback(words[1:])
+            elif name == b"QUIT":
+                self.sessions.pop(self.find(words[1:], 0))
+                reply = "OK"
+            elif name == b"STATS":
+                reply = (f"STATS sessions={len(self.sessions)} games={self.games} "
+                         f"guesses={self.guesses} evicted={self.evicted}")
+            else:
+                reply = f"ERR unknown command {name.decode(errors='replace')}"
+        except ValueError as error:     # Only raised with the messages above
+            reply = f"ERR {error}"
+        return reply.encode() + b"\n"
+
+    def find(self, args, count):
+        """
+        Checks a command got an id and count more args, and returns the id.
+        """
+        if len(args) != count + 1:
+            raise ValueError(f"expected {count + 1} arguments")
+        if not args[0].isdigit():
+            raise ValueError("bad game id")
+        session = int(args[0])
+        if session not in self.sessions:
+            raise ValueError(f"no game {session}")
+        return session
+
+    def touch(self, session):
+        """
+        Marks a game as used now. Returns its Game.
+        """
+        hosted = self.sessions[session]
+        hosted.seen = time.monotonic()
+        self.sessions.move_to_end(session)
+        return hosted.game
+
+    def new(self, args):
+        """
+        NEW [pegs colours rows]: starts a game.
+        """
+        if args:
+            if len(args) != 3 or not all(arg.isdigit() for arg in args):
+                raise ValueError("NEW takes no sizes or pegs colours rows")
+            pegs, colours, rows = map(int, args)
+            if not (1 <= pegs <= MAX_PEGS and 2 <= colours <= len(DIGITS) and 1 <= rows <= MAX_ROWS):
+                raise ValueError("size out of range")
+            config = Config(pegs, colours, rows)
+        else:
+            config = self.config
+        session = self.next_id
+        self.next_id += 1
+        self.sessions[session] = Hosted(Game(self.rng, config), time.monotonic())
+        self.games += 1
+        return f"OK {session} {config.pegs} {config.colours} {config.rows}"
+
+    def guess(self, args):
+        """
+        GUESS id code: puts the code in the game's row and scores it.
+        """
+        game = self.touch(self.find(args, 1))
+        colours = DIGITS[:game.config.colours].encode()
+        code = args[1].lower()
+        if len(code) != game.config.pegs or any(box not in colours for box in code):
+            raise ValueError("bad code")
+        if game.game_ended:
+            raise ValueError("game is over")
+        black, white = game.submit([colours.index(box) for box in code])
+        self.guesses += 1
+        if game.won:
+            return f"FB {black} {white} WON"
+        if game.game_ended:
+            return f"FB {black} {white} LOST {encode(game.secret)}"
+        return f"FB {black} {white} PLAY"
+
+    def feedback(self, args):
+        """
+        FEEDBACK id: every row entered so far and its score.
+        """
+        game = self.touch(self.find(args, 0))
+        rows = [
+            f"{encode(row)}:{black},{white}"
+            for row, (black, white) in zip(game.board, game.feedback)
+        ]
+        return " ".join(["ROWS", state(game)] + rows)
+
+    def evict(self):
+        """
+        Drops the games that have been idle too long. Returns how many.
+        """
+        cutoff = time.monotonic() - self.idle
+        dropped = 0
+        while self.sessions:
+            session, hosted = next(iter(self.sessions.items()))
+            if hosted.seen > cutoff:            # The rest were used more recently
+                break
+            del self.sessions[session]
+            dropped += 1
+        self.evicted += dropped
+        return dropped
+
+    async def evictor(self):
+        """
+        Evicts idle games a few times per idle period, forever.
+        """
+        while True:
+            await asyncio.sleep(max(1, self.idle / 4))
+            self.evict()
+
+
+class Connection(asyncio.Protocol):
+    """
+    One client. Every complete line that arrives is answered, and the
+    replies to a batch of lines go back in one write, so clients that
+    send many commands at once cost few system calls.
+    """
+    def __init__(self, server):
+        self.server = server
+        self.pending = b""      # Start of a line that has not ended yet
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        lines = (self.pending + data).split(b"\n")
+        self.pending = lines.pop()
+        if len(self.pending) > MAX_LINE:
+            self.transport.write(b"ERR line too long\n")
+            self.transport.close()
+            return
+        if lines:
+            self.transport.write(b"".join(map(self.server.command, lines)))
+
+    def pause_writing(self):
+        self.transport.pause_reading()      # Stop reading until the client catches up
+
+    def resume_writing(self):
+        self.transport.resume_reading()
+
+# --- Functions ---
+
+def encode(code):
+    """
+    Writes a code as one digit per box.
+    """
+    return "".join(DIGITS[box] for box in code)
+
+
+def state(game):
+    """
+    PLAY, WON or LOST for a Game.
+    """
+    if game.won:
+        return "WON"
+    return "LOST" if game.game_ended else "PLAY"
+
+
+async def serve(server, host="127.0.0.1", port=7777, unix=None):
+    """
+    Serves until cancelled.
+    """
+    loop = asyncio.get_running_loop()
+    if unix:
+        listener = await loop.create_unix_server(lambda: Connection(server), unix)
+    else:
+        listener = await loop.create_server(lambda: Connection(server), host, port)
+    for sock in listener.sockets:
+        print(f"Serving on {sock.getsockname()}")
+    evictor = asyncio.create_task(server.evictor())
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        evictor.cancel()
+
+
+def main():
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description="Host Mastermind games over a socket.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=7777, help="TCP port to listen on")
+    parser.add_argument("--unix", help="listen on this Unix socket instead")
+    parser.add_argument("--idle", type=float, default=300, help="seconds before an unused game is dropped")
+    parser.add_argument("--pegs", type=int, default=DEFAULT.pegs, help="boxes per row")
+    parser.add_argument("--colours", type=int, default=DEFAULT.colours, help="patterns per box")
+    parser.add_argument("--rows", type=int, default=DEFAULT.rows, help="guesses allowed")
+    parser.add_argument("--seed", type=int, help="seed for the secrets")
+    args = parser.parse_args()
+
+    server = Server(Config(args.pegs, args.colours, args.rows), args.idle, args.seed)
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+# --- Main ---
+if __name__ == "__main__":
+    main()
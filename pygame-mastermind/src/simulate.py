@@ -0,0 +1,230 @@
+"""
+Plays lots of games with a guessing strategy and reports how it did.
+
+Games are split into chunks and played across a pool of processes.
+Each chunk gets its own seeded random stream, so a run with the same
+seed gives the same results no matter how many workers there are.
+
+Usage:
+    python simulate.py -n 100000 -s minimax -j 8
+
+A strategy is any class taking an engine.Config, with new_game(rng),
+guess() -> list of ints and feedback(guess, black, white). Besides
+the built-in ones, a class can be given as module:Class.
+"""
+
+# --- Imports ---
+import argparse, importlib, os, random, time    # Standard imports
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from engine import Game, Config, DEFAULT, pack  # Local imports
+from scoring import score
+
+# --- Strategies ---
+
+class RandomStrategy:
+    """
+    Guesses a random code that fits all the feedback so far.
+    """
+    def __init__(self, config=DEFAULT):
+        """
+        List every code once, they are filtered down each game.
+        """
+        self.colours = config.colours
+        self.codes = [[]]
+        for i in range(config.pegs):
+            self.codes = [code + [c] for code in self.codes for c in range(config.colours)]
+
+    def new_game(self, rng):
+        """
+        Every code is possible again.
+        """
+        self.rng = rng
+        self.candidates = self.codes
+
+    def guess(self):
+        """
+        Pick any code that is still possible.
+        """
+        return self.rng.choice(self.candidates)
+
+    def feedback(self, guess, black, white):
+        """
+        Keep the codes that would have scored the same.
+        """
+        self.candidates = [
+            code for code in self.candidates
+            if score(guess, code, self.colours) == (black, white)
+        ]
+
+
+class SolverStrategy:
+    """
+    Plays the guesses of solver.Solver ("minimax" or "expected").
+    The solver always makes the same guess after the same feedback,
+    so its guesses are remembered by the feedback that led to them and
+    the solver is only caught up on feedback when it has to think.
+    """
+    def __init__(self, config=DEFAULT, strategy="minimax"):
+        """
+        Builds the solver and its feedback table once per process.
+        """
+        from solver import Solver                  # Needs NumPy
+        self.solver = Solver(config.pegs, config.colours, strategy)
+        self.colours = config.colours
+        self.memo = {}          # Feedback so far -> code number to guess
+
+    def new_game(self, rng):
+        """
+        Every code is possible again.
+        """
+        self.solver.reset()
+        self.history = ()
+        self.pending = []       # Feedback the solver has not been told yet
+
+    def guess(self):
+        """
+        Ask the solver for its next guess.
+        """
+        index = self.memo.get(self.history)
+        if index is None:
+            for guess, black, white in self.pending:
+                self.solver.update(pack(guess, self.colours), black, white)
+            self.pending = []
+            index = self.memo[self.history] = self.solver.next_guess()
+        return [int(box) for box in self.solver.codes[index]]
+
+    def feedback(self, guess, black, white):
+        """
+        Narrow the solver's candidates down.
+        """
+        self.history += ((black, white),)
+        self.pending.append((guess, black, white))
+
+
+STRATEGIES = {
+    "random": RandomStrategy,
+    "minimax": lambda config: SolverStrategy(config, "minimax"),
+    "expected": lambda config: SolverStrategy(config, "expected")
+}
+
+
+def make_strategy(name, config=DEFAULT):
+    """
+    Makes a strategy from a built-in name or a module:Class spec.
+    """
+    if name in STRATEGIES:
+        return STRATEGIES[name](config)
+    if ":" in name:
+        module, cls = name.split(":", 1)
+        return getattr(importlib.import_module(module), cls)(config)
+    raise ValueError(f"unknown strategy {name!r}")
+
+# --- Playing games ---
+
+def play(game, strategy, rng):
+    """
+    Plays one game to the end. Returns (guesses used, won).
+    """
+    strategy.new_game(rng)
+    while not game.game_ended:
+        guess = strategy.guess()
+        black, white = game.submit(guess)
+        strategy.feedback(guess, black, white)
+    return len(game.feedback), game.won
+
+
+_strategy = None    # The strategy of this worker process
+
+
+def _init_worker(name, config):
+    """
+    Makes the strategy once when a worker process starts.
+    """
+    global _strategy
+    _strategy = make_strategy(name, config)
+
+
+def play_chunk(config, seed, chunk, count):
+    """
+    Plays count games with the worker's strategy. The chunk's random
+    stream makes both the secrets and the strategy's choices.
+    Returns a Counter of guesses used for wins, and the number of losses.
+    """
+    rng = random.Random(f"{seed}:{chunk}")
+    game = Game(rng, config)
+    guesses = Counter()
+    losses = 0
+    for i in range(count):
+        game.reset()                    # New secret from the chunk's stream
+        used, won = play(game, _strategy, rng)
+        if won:
+            guesses[used] += 1
+        else:
+            losses += 1
+    return guesses, losses
+
+
+def simulate(games, strategy="minimax", config=DEFAULT, workers=None, chunk=1000, seed=0):
+    """
+    Plays games across a process pool. Returns (guesses Counter, losses).
+    """
+    guesses = Counter()
+    losses = 0
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(strategy, config)) as pool:
+        futures = [
+            pool.submit(play_chunk, config, seed, i, min(chunk, games - start))
+            for i, start in enumerate(range(0, games, chunk))
+        ]
+        for future in as_completed(futures):
+            chunk_guesses, chunk_losses = future.result()
+            guesses += chunk_guesses
+            losses += chunk_losses
+    return guesses, losses
+
+
+def main():
+    """
+    Command line entry point.
+    """
+    parser = argparse.ArgumentParser(description="Play lots of Mastermind games with a strategy.")
+    parser.add_argument("-n", "--games", type=int, default=10000, help="games to play")
+    parser.add_argument("-s", "--strategy", default="minimax",
+                        help="random, minimax, expected or module:Class")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(), help="processes to use")
+    parser.add_argument("--chunk", type=int, default=1000, help="games per work item")
+    parser.add_argument("--pegs", type=int, default=DEFAULT.pegs, help="boxes per row")
+    parser.add_argument("--colours", type=int, default=DEFAULT.colours, help="patterns per box")
+    parser.add_argument("--rows", type=int, default=DEFAULT.rows, help="guesses allowed")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the secrets")
+    args = parser.parse_args()
+    if args.games < 1:
+        parser.error("--games must be at least 1")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.chunk < 1:
+        parser.error("--chunk must be at least 1")
+
+    config = Config(args.pegs, args.colours, args.rows)
+    start = time.perf_counter()
+    guesses, losses = simulate(args.games, args.strategy, config, args.workers, args.chunk, args.seed)
+    elapsed = time.perf_counter() - start
+
+    wins = sum(guesses.values())
+    print(f"{args.games} games of {config}, strategy {args.strategy}, {args.workers} workers")
+    print("Guesses to win:")
+    for used in range(1, config.rows + 1):
+        count = guesses[used]
+        print(f"  {used}: {count:>10} ({count / args.games:7.2%})")
+    print(f"  lost: {losses:>7} ({losses / args.games:7.2%})")
+    if wins:
+        mean = sum(used * count for used, count in guesses.items()) / wins
+        print(f"Mean guesses to win: {mean:.3f}")
+    print(f"Win rate within {config.rows} rows: {wins / args.games:.2%}")
+    print(f"{args.games / elapsed:.0f} games/s ({elapsed:.2f} s)")
+
+
+# --- Main ---
+if __name__ == "__main__":
+    main()
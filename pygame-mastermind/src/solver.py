@@ -0,0 +1,174 @@
+"""
+A Knuth-style minimax code breaker.
+
+Every code is numbered by engine.pack, reading it as a base-colours
+number with the first box most significant. The feedback of every
+guess against every secret is worked out once into a uint8 table, and
+each guess is picked by looking at how it would split the codes that
+are still possible.
+
+By default the table and the opening book (the first two guesses)
+come from tables.load, which keeps them in a memory mapped file so
+they are only ever worked out once.
+"""
+
+# --- Imports ---
+import numpy as np                              # 3rd Party imports
+
+from engine import PEGS, COLOURS, pack          # Local imports
+from scoring import score_batch, feedback_index
+
+# --- Consts ---
+BLOCK = 512     # Rows of the table worked on at once, to bound memory
+STRATEGIES = ("minimax", "expected")
+UNKNOWN = 0xFFFFFFFF    # Book slot not worked out yet
+
+# --- Functions ---
+
+def all_codes(pegs=PEGS, colours=COLOURS):
+    """
+    Returns every code as a (colours ** pegs, pegs) uint8 array,
+    in the same order as itertools.product(range(colours), repeat=pegs).
+    """
+    n = colours ** pegs
+    place = colours ** np.arange(pegs - 1, -1, -1)      # Place value of each box
+    return ((np.arange(n)[:, None] // place) % colours).astype(np.uint8)
+
+
+def feedback_rows(codes, start, stop, colours=COLOURS):
+    """
+    Scores codes[start:stop] against every code. Returns those rows of
+    the feedback table as a uint8 array.
+    """
+    black, white = score_batch(codes[start:stop, None, :], codes[None, :, :], colours)
+    return feedback_index(black, white, codes.shape[1])
+
+
+def feedback_table(codes, colours=COLOURS):
+    """
+    Scores every code against every code. Returns a (n, n) uint8 table
+    where [guess, secret] is the feedback_index of the score.
+    """
+    n = len(codes)
+    table = np.empty((n, n), dtype=np.uint8)
+    for start in range(0, n, BLOCK):                    # A block of guesses at a time
+        table[start:start + BLOCK] = feedback_rows(codes, start, start + BLOCK, colours)
+    return table
+
+# --- Classes ---
+
+class Solver:
+    """
+    Picks guesses that shrink the set of possible secrets the most.
+
+    The "minimax" strategy picks the guess whose worst case leaves the
+    fewest codes (Knuth). The "expected" strategy picks the guess with
+    the smallest expected number of codes left. Ties go to guesses that
+    could still be the secret, then to the lowest numbered code.
+    """
+    def __init__(self, pegs=PEGS, colours=COLOURS, strategy="minimax", table=None):
+        """
+        Opens the shared feedback table for the board size, or uses the
+        table given, which can be a plain array from feedback_table.
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"unknown strategy {strategy!r}")
+
+        self.pegs = pegs
+        self.colours = colours
+        self.strategy = strategy
+        self.codes = all_codes(pegs, colours)
+        if table is None:
+            from tables import load
+            table = load(pegs, colours)
+        self.table = table
+        self.outcomes = (pegs + 1) ** 2         # Number of feedback_index values
+
+        # First guess, then the second after each feedback to it
+        if hasattr(table, "book"):
+            self.book = table.book(strategy)    # Kept in the table's file
+        else:
+            self.book = np.full(1 + self.outcomes, UNKNOWN, dtype=np.uint32)
+        self.reset()
+
+    def reset(self):
+        """
+        Forget all feedback, so every code is possible again.
+        """
+        self.candidates = np.arange(len(self.codes))
+        self.history = []                       # (guess, feedback_index) so far
+
+    def update(self, guess, black, white):
+        """
+        Keeps only the codes that would have given this feedback.
+        guess is a code number.
+        """
+        fb = feedback_index(black, white, self.pegs)
+        keep = self.table[guess, self.candidates] == fb
+        self.candidates = self.candidates[keep]
+        self.history.append((guess, fb))
+
+    def next_guess(self):
+        """
+        Returns the code number of the best guess from here.
+        """
+        n = len(self.candidates)
+        if n == 0:
+            raise ValueError("no code fits the feedback given")
+        if n <= 2:                              # Just guess one of them
+            return int(self.candidates[0])
+
+        slot = self.book_slot()
+        if slot is not None and self.book[slot] != UNKNOWN:
+            return int(self.book[slot])
+
+        best = None
+        for start in range(0, len(self.codes), BLOCK):
+            rows = self.table[start:start + BLOCK, self.candidates]
+            guesses = len(rows)
+
+            # Count how many candidates land in each outcome for every guess
+            offsets = np.arange(guesses)[:, None] * self.outcomes
+            flat = (rows + offsets).ravel()
+            sizes = np.bincount(flat, minlength=guesses * self.outcomes)
+            sizes = sizes.reshape(guesses, self.outcomes)
+
+            if self.strategy == "minimax":
+                cost = sizes.max(axis=1)
+            else:
+                cost = (sizes * sizes).sum(axis=1)      # n * expected size left
+
+            # Prefer guesses that could win outright on a tie
+            is_candidate = np.zeros(guesses, dtype=bool)
+            inside = self.candidates[(self.candidates >= start) & (self.candidates < start + guesses)]
+            is_candidate[inside - start] = True
+            key = cost.astype(np.int64) * 2 + ~is_candidate
+
+            i = int(key.argmin())
+            if best is None or key[i] < best[0]:
+                best = (key[i], start + i)
+
+        if slot is not None:
+            self.book[slot] = best[1]
+        return int(best[1])
+
+    def book_slot(self):
+        """
+        Where the next guess is in the opening book, or None if it is
+        past the first two guesses or the first was not the book's.
+        """
+        if not self.history:
+            return 0
+        if len(self.history) == 1 and self.history[0][0] == self.book[0]:
+            return 1 + self.history[0][1]
+        return None
+
+    def suggest(self, game):
+        """
+        Works out the best next guess for an engine.Game from the rows
+        it has already scored. Returns the guess as a list of ints.
+        """
+        self.reset()
+        for row, (black, white) in zip(game.board, game.feedback):
+            self.update(pack(row, self.colours), black, white)
+        return [int(box) for box in self.codes[self.next_guess()]]
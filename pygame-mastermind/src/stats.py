@@ -0,0 +1,164 @@
+"""
+Keeps statistics of finished games in SQLite.
+
+Every finished game is saved whole (secret, guesses, feedback, guesses
+used, won and how long it took), and running totals are kept per board
+size: games, wins and a histogram of the guesses used to win. The
+totals are added to as games come in, so reading them for the stats
+screen is a couple of primary key lookups however many games there are.
+
+The game only puts finished games on a queue. A writer thread takes
+everything queued and writes it in one transaction, so the frame loop
+never waits on the disk. The database is in WAL mode, so reading the
+totals does not wait for the writer either.
+"""
+
+# --- Imports ---
+import queue, sqlite3, threading, time          # Standard imports
+
+# --- Consts ---
+BATCH = 512         # Most games written in one transaction
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    finished REAL NOT NULL,         -- Unix time
+    pegs INTEGER NOT NULL,
+    colours INTEGER NOT NULL,
+    rows INTEGER NOT NULL,
+    secret BLOB NOT NULL,           -- One byte per box
+    guesses BLOB NOT NULL,          -- The rows entered, one after another
+    feedback BLOB NOT NULL,         -- Black then white per row
+    used INTEGER NOT NULL,          -- Rows entered
+    won INTEGER NOT NULL,
+    duration REAL NOT NULL          -- Seconds
+);
+CREATE TABLE IF NOT EXISTS totals (
+    pegs INTEGER, colours INTEGER, rows INTEGER,
+    games INTEGER NOT NULL, wins INTEGER NOT NULL,
+    won_guesses INTEGER NOT NULL,   -- Sum of used over won games
+    duration REAL NOT NULL,         -- Sum over all games
+    PRIMARY KEY (pegs, colours, rows)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS histogram (
+    pegs INTEGER, colours INTEGER, rows INTEGER,
+    used INTEGER, wins INTEGER NOT NULL,
+    PRIMARY KEY (pegs, colours, rows, used)
+) WITHOUT ROWID;
+"""
+
+INSERT_GAME = """
+INSERT INTO games (finished, pegs, colours, rows, secret, guesses, feedback, used, won, duration)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+ADD_TOTALS = """
+INSERT INTO totals VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (pegs, colours, rows) DO UPDATE SET
+    games = games + excluded.games,
+    wins = wins + excluded.wins,
+    won_guesses = won_guesses + excluded.won_guesses,
+    duration = duration + excluded.duration
+"""
+ADD_HISTOGRAM = """
+INSERT INTO histogram VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (pegs, colours, rows, used) DO UPDATE SET wins = wins + excluded.wins
+"""
+
+# --- Classes ---
+
+class StatsStore:
+    """
+    Saves finished games on a writer thread and reads back the totals.
+    """
+    def __init__(self, path):
+        """
+        Opens (making if needed) the database at path and starts the
+        writer thread.
+        """
+        self.path = path
+        with sqlite3.connect(path) as db:
+            db.execute("PRAGMA journal_mode=WAL")   # Stays set in the file
+            db.executescript(SCHEMA)
+        db.close()
+        self.reader = None          # Connection for summary, made on first use
+
+        self.queue = queue.SimpleQueue()
+        self.writer = threading.Thread(target=self.write, name="stats", daemon=True)
+        self.writer.start()
+
+    def record(self, game, duration):
+        """
+        Queues a finished engine.Game, which took duration seconds.
+        Only copies what it needs, so the Game can be reset straight after.
+        """
+        config = game.config
+        used = len(game.feedback)
+        self.queue.put((
+            time.time(), config.pegs, config.colours, config.rows,
+            bytes(game.secret),
+            bytes(game.board)[:used * config.pegs],
+            bytes(box for row in game.feedback for box in row),
+            used, int(game.won), duration
+        ))
+
+    def write(self):
+        """
+        The writer thread. Writes whatever is queued in one transaction
+        at a time, until close() queues None.
+        """
+        db = sqlite3.connect(self.path)
+        db.execute("PRAGMA synchronous=NORMAL")     # Safe with WAL, fewer fsyncs
+        running = True
+        while running:
+            batch = [self.queue.get()]              # Sleep until there is something
+            while len(batch) < BATCH:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                running = False
+                batch = [row for row in batch if row is not None]
+            if not batch:
+                continue
+
+            totals = {}                             # Sum the batch up first
+            histogram = {}
+            for finished, pegs, colours, rows, secret, guesses, feedback, used, won, duration in batch:
+                key = (pegs, colours, rows)
+                games, wins, won_guesses, time_taken = totals.get(key, (0, 0, 0, 0.0))
+                totals[key] = (games + 1, wins + won, won_guesses + used * won, time_taken + duration)
+                if won:
+                    histogram[key + (used,)] = histogram.get(key + (used,), 0) + 1
+            with db:                                # One transaction
+                db.executemany(INSERT_GAME, batch)
+                db.executemany(ADD_TOTALS, [key + value for key, value in totals.items()])
+                db.executemany(ADD_HISTOGRAM, [key + (count,) for key, count in histogram.items()])
+        db.close()
+
+    def summary(self, config):
+        """
+        The totals for a board size as a dict of games, wins,
+        won_guesses, duration and histogram ({used: wins}).
+        """
+        if self.reader is None:
+            self.reader = sqlite3.connect(self.path)
+        row = self.reader.execute(
+            "SELECT games, wins, won_guesses, duration FROM totals "
+            "WHERE pegs = ? AND colours = ? AND rows = ?", config
+        ).fetchone() or (0, 0, 0, 0.0)
+        histogram = dict(self.reader.execute(
+            "SELECT used, wins FROM histogram WHERE pegs = ? AND colours = ? AND rows = ?", config
+        ))
+        games, wins, won_guesses, duration = row
+        return {"games": games, "wins": wins, "won_guesses": won_guesses,
+                "duration": duration, "histogram": histogram}
+
+    def close(self):
+        """
+        Writes anything still queued and stops the writer.
+        """
+        self.queue.put(None)
+        self.writer.join()
+        if self.reader is not None:
+            self.reader.close()
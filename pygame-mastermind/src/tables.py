@@ -0,0 +1,208 @@
+"""
+The feedback table and opening book, kept in a file and memory mapped.
+
+Working out the feedback of every guess against every secret takes a
+while for bigger boards, and the table gets big (1.7 M entries for 4
+boxes of 6 patterns, about 1 G for 5 of 8). So it is worked out once
+into a file in the cache folder and opened with numpy.memmap. Every
+process that opens it shares the same pages, and nothing has to be
+worked out again next time.
+
+The table is filled in blocks of rows, only when a block is first
+read, so a variant too big to fill in all at once can still be used.
+Each block has a flag in the file that is set once its rows are
+written. Two processes filling the same block write the same bytes,
+so they do not need to lock.
+
+The file also holds the opening book for each strategy: the first
+guess, and the second guess after each feedback to it. A slot is
+filled the first time the solver works it out.
+
+File layout, all little endian:
+    header      magic, version, pegs, colours, codes, rows per block
+    flags       one byte per block, 1 once its rows are written
+    books       per strategy, uint32 first guess then one per feedback
+    table       codes x codes uint8 feedback_index, page aligned
+"""
+
+# --- Imports ---
+import argparse, os, struct, time               # Standard imports
+
+import numpy as np                              # 3rd Party imports
+
+from engine import CACHE_DIR                    # Local imports
+from solver import BLOCK, STRATEGIES, UNKNOWN, all_codes, feedback_rows
+
+# --- Consts ---
+MAGIC = b"MMFT"
+VERSION = 1
+HEADER = struct.Struct("<4sHBBII")  # Magic, version, pegs, colours, codes, rows per block
+FLAGS_AT = 64                       # Where the block flags start
+PAGE = 4096                         # The table starts on a page boundary
+
+# --- Classes ---
+
+class FeedbackTable:
+    """
+    A (codes, codes) feedback table that fills its rows in on first use.
+    Index it like the NumPy array from solver.feedback_table.
+    """
+    def __init__(self, pegs, colours, path=None):
+        """
+        Opens (making it if needed) the file at path, or keeps the table
+        in memory if path is None.
+        """
+        self.pegs = pegs
+        self.colours = colours
+        self.codes = all_codes(pegs, colours)
+        self.n = len(self.codes)
+        self.blocks = -(-self.n // BLOCK)
+        self.outcomes = (pegs + 1) ** 2
+        self.path = path
+
+        books_at = (FLAGS_AT + self.blocks + 7) // 8 * 8
+        book_shape = (len(STRATEGIES), 1 + self.outcomes)
+        table_at = (books_at + 4 * book_shape[0] * book_shape[1] + PAGE - 1) // PAGE * PAGE
+
+        if path is None:
+            self.flags = np.zeros(self.blocks, dtype=np.uint8)
+            self.books = np.full(book_shape, UNKNOWN, dtype=np.uint32)
+            self.table = np.empty((self.n, self.n), dtype=np.uint8)
+            return
+
+        size = table_at + self.n * self.n
+        if not self.valid(path, size):
+            self.create(path, books_at, size)
+        self.flags = np.memmap(path, np.uint8, "r+", FLAGS_AT, (self.blocks,))
+        self.books = np.memmap(path, np.uint32, "r+", books_at, book_shape)
+        self.table = np.memmap(path, np.uint8, "r+", table_at, (self.n, self.n))
+
+    def valid(self, path, size):
+        """
+        True if path is a whole table file of this version and board size.
+        """
+        try:
+            with open(path, "rb") as file:
+                header = file.read(HEADER.size)
+            if os.path.getsize(path) != size:
+                return False
+        except OSError:
+            return False
+        return header == HEADER.pack(MAGIC, VERSION, self.pegs, self.colours, self.n, BLOCK)
+
+    def create(self, path, books_at, size):
+        """
+        Writes a new file with no blocks or book slots filled. The table
+        part is left as a hole, so it takes no disk space until written.
+        It is made under another name and moved into place, so no one
+        opens it half written.
+        """
+        temp = f"{path}.{os.getpid()}.tmp"
+        with open(temp, "wb") as file:
+            file.write(HEADER.pack(MAGIC, VERSION, self.pegs, self.colours, self.n, BLOCK))
+            file.seek(books_at)
+            file.write(np.full((len(STRATEGIES), 1 + self.outcomes), UNKNOWN, dtype="<u4").tobytes())
+            file.truncate(size)
+        os.replace(temp, path)
+
+    def fill(self, first, last):
+        """
+        Makes sure blocks first to last (inclusive) are worked out.
+        """
+        for block in range(first, last + 1):
+            if not self.flags[block]:
+                start = block * BLOCK
+                self.table[start:start + BLOCK] = feedback_rows(self.codes, start, start + BLOCK, self.colours)
+                self.flags[block] = 1           # Only once the rows are in
+
+    def __getitem__(self, key):
+        rows = key[0] if isinstance(key, tuple) else key
+        if isinstance(rows, slice):
+            start, stop, step = rows.indices(self.n)
+            if stop > start:
+                self.fill(start // BLOCK, (stop - 1) // BLOCK)
+        elif isinstance(rows, (int, np.integer)):
+            self.fill(rows // BLOCK, rows // BLOCK)
+        else:                                   # Any other index, fill the lot
+            self.fill(0, self.blocks - 1)
+        return self.table[key]
+
+    def __len__(self):
+        return self.n
+
+    def book(self, strategy):
+        """
+        The uint32 opening book of a strategy: the first guess, then
+        the second guess for each feedback_index to it. Writing to it
+        writes to the file.
+        """
+        return self.books[STRATEGIES.index(strategy)]
+
+    def flush(self):
+        """
+        Writes changed pages back to the file.
+        """
+        if self.path is not None:
+            for array in (self.flags, self.books, self.table):
+                array.flush()
+
+# --- Functions ---
+
+_open = {}      # (pegs, colours) -> FeedbackTable opened by this process
+
+
+def load(pegs, colours, folder=CACHE_DIR):
+    """
+    Returns the shared FeedbackTable for a board size, from the file in
+    folder. If the file cannot be made, the table is kept in memory.
+    """
+    key = (pegs, colours)
+    if key not in _open:
+        path = os.path.join(folder, f"feedback-{pegs}x{colours}.bin")
+        try:
+            os.makedirs(folder, exist_ok=True)
+            _open[key] = FeedbackTable(pegs, colours, path)
+        except OSError:                         # Read only home, no disk space...
+            _open[key] = FeedbackTable(pegs, colours)
+    return _open[key]
+
+
+def main():
+    """
+    Command line entry point, to build a table and book ahead of time.
+    """
+    from solver import Solver
+
+    parser = argparse.ArgumentParser(description="Build the feedback table and opening book.")
+    parser.add_argument("--pegs", type=int, default=4, help="boxes per row")
+    parser.add_argument("--colours", type=int, default=6, help="patterns per box")
+    parser.add_argument("-s", "--strategy", default="minimax", help="minimax or expected")
+    parser.add_argument("--no-book", action="store_true", help="only build the table")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table = load(args.pegs, args.colours)
+    print(f"Opened {table.path or 'an in-memory table'} in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    table.fill(0, table.blocks - 1)
+    print(f"Table of {table.n} x {table.n} ready in {time.perf_counter() - start:.2f} s")
+
+    if not args.no_book:
+        start = time.perf_counter()
+        solver = Solver(args.pegs, args.colours, args.strategy, table)
+        first = solver.next_guess()
+        for fb in range(table.outcomes):
+            solver.reset()
+            solver.update(first, *divmod(fb, args.pegs + 1))
+            if len(solver.candidates):
+                solver.next_guess()
+        book = table.book(args.strategy)
+        print(f"Book for {args.strategy} ready in {time.perf_counter() - start:.2f} s, "
+              f"first guess {[int(box) for box in table.codes[book[0]]]}")
+    table.flush()
+
+
+# --- Main ---
+if __name__ == "__main__":
+    main()